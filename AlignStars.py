@@ -0,0 +1,176 @@
+#!/usr/bin/env python
+# -----------------------------------------------------------------------------
+# Name:        AlignStars.py
+# Purpose:     Bright star selection for sync and high precision pointing
+#
+# Author(s):   R J Schumacher
+#
+# Created:     2026/10/19
+# RCS-ID:      $Id: AlignStars.py $
+# Copyright:   (c) 2026
+# Licence:     LGPL
+#
+# -----------------------------------------------------------------------------
+"""
+Picks bright stars near a target to center and sync on, from a local
+Catalog, scoring them by distance, altitude and magnitude:
+
+from LX200.AlignStars import AlignStars
+stars = AlignStars(Catalog('objects'), scope, faint=3.5)
+best = stars.select(83.8, -5.4, n=3)          # RA/Dec degrees, now
+library.set_star_catalog(STAR_CATALOGS.index(best.catalog[0]))
+library.set_star_object(best.number[0])
+library.sync_object()
+rows = stars.best(ra, dec, utc)                # a whole sequence at once
+
+The stars are held as unit vectors, so the separations of many targets
+from all of them are one matrix product, and altitudes come from the same
+outer product trick as the Planner. A single target only scores the stars
+a SkyIndex cone search finds, as does best when faint lets in more than
+MATRIX_STARS stars. A lower score is better; stars below minAlt or further
+than radius are never picked.
+
+Needs numpy.
+"""
+
+import time
+from types import SimpleNamespace
+import numpy as np
+from .LX200Error import LX200Error
+from .LX200Utils import *
+from .Catalog import CATALOGS, OBJECT_TYPES
+from .SkyIndex import SkyIndex, unit_vectors
+
+BRIGHTEST = -1.5  # magnitude scored as best, about Sirius
+MATRIX_STARS = 4096  # up to this many stars best scores them all at once
+STAR_FIELDS = [('row', int), ('catalog', 'U9'), ('number', int),
+               ('ra', float), ('dec', float), ('mag', float), ('sep', float),
+               ('alt', float), ('score', float)]
+
+
+class AlignStars:
+    """Alignment and sync star chooser over a Catalog's bright stars"""
+
+    def __init__(self, catalog, scope=None, lat=None, long=None, faint=3.5,
+                 minAlt=20., radius=30.):
+        """Constructor.
+        Arguments: a Catalog; a Telescope to take the site latitude and
+        longitude from, or lat/long in degrees (West positive); faint the
+        faintest magnitude to use, minAlt the lowest altitude and radius
+        the furthest from the target, in degrees
+        """
+        if scope is not None:
+            lat = to_float(scope.get_site_lat()) if lat is None else lat
+            long = to_float(scope.get_current_long()) if long is None else long
+        if lat is None or long is None:
+            raise LX200Error("AlignStars needs a scope or lat and long")
+        self.catalog = catalog
+        self.lat = lat
+        self.long = long
+        self.faint = faint
+        self.minAlt = minAlt
+        self.radius = radius
+        # score weights of distance, altitude and magnitude
+        self.weights = (1., .5, .5)
+        codes = np.asarray(catalog.catalog)
+        stars = np.array([c[1] == 'LS' for c in CATALOGS])[codes] | \
+            (np.asarray(catalog.type) == OBJECT_TYPES.index('Star'))
+        mag = np.asarray(catalog.mag, dtype=float)
+        self.rows = np.nonzero(stars & (mag <= faint))[0]
+        self.ra = np.asarray(catalog.ra, dtype=float)[self.rows]
+        self.dec = np.asarray(catalog.dec, dtype=float)[self.rows]
+        self.mag = mag[self.rows]
+        self.xyz = unit_vectors(self.ra, self.dec)
+        lat = np.radians(lat)
+        d = np.radians(self.dec)
+        # sin(alt) = a + b cos(lst - ra)
+        self.a = np.sin(d) * np.sin(lat)
+        self.b = np.cos(d) * np.cos(lat)
+        self.cosRA = np.cos(np.radians(self.ra))
+        self.sinRA = np.sin(np.radians(self.ra))
+        self.index = SkyIndex(SimpleNamespace(ra=self.ra, dec=self.dec))
+
+    def __repr__(self):
+        """Return a representation string.
+        """
+        return "<LX200 AlignStars instance, %d stars>" % len(self.rows)
+
+    def scores(self, ra, dec, utc=None, stars=None):
+        """ Separation, altitude and score of the stars (indexes into
+        self.rows, all if None) for each target, RA/Dec arrays in degrees
+        observed at utc (unix seconds, an array or one time, now if None)
+        Returns: (targets, stars) arrays sep, alt, score; score inf where a
+        star cannot be used"""
+        if stars is None:
+            stars = slice(None)
+        ra = np.atleast_1d(np.asarray(ra, dtype=float))
+        dec = np.atleast_1d(np.asarray(dec, dtype=float))
+        utc = time.time() if utc is None else utc
+        lst = np.radians(np.broadcast_to(
+            local_sidereal_time_array(self.long, utc), ra.shape) * 15.)
+        cosSep = np.clip(unit_vectors(ra, dec).dot(self.xyz[stars].T), -1., 1.)
+        sep = np.degrees(np.arccos(cosSep))
+        sinAlt = self.a[stars] + self.b[stars] * (
+            np.outer(np.cos(lst), self.cosRA[stars]) +
+            np.outer(np.sin(lst), self.sinRA[stars]))
+        alt = np.degrees(np.arcsin(np.clip(sinAlt, -1., 1.)))
+        wDist, wAlt, wMag = self.weights
+        score = (wDist * sep / self.radius +
+                 wAlt * (90. - alt) / max(90. - self.minAlt, 1.) +
+                 wMag * (self.mag[stars] - BRIGHTEST) /
+                 (self.faint - BRIGHTEST))
+        score[(sep > self.radius) | (alt < self.minAlt)] = np.inf
+        return sep, alt, score
+
+    def _result(self, stars, sep, alt, score):
+        res = np.zeros(len(stars), dtype=STAR_FIELDS)
+        rows = self.rows[stars]
+        res['row'] = rows
+        res['catalog'] = [CATALOGS[c][0] for c in
+                          np.asarray(self.catalog.catalog)[rows]]
+        res['number'] = np.asarray(self.catalog.number)[rows]
+        res['ra'], res['dec'], res['mag'] = (self.ra[stars], self.dec[stars],
+                                             self.mag[stars])
+        res['sep'], res['alt'], res['score'] = sep, alt, score
+        return res.view(np.recarray)
+
+    def select(self, ra, dec, utc=None, n=3):
+        """ The n best stars for one target, RA/Dec in degrees at utc (now
+        if None), best first; fewer if fewer are usable
+        Returns: a numpy record array with STAR_FIELDS per star"""
+        stars = np.sort(self.index.within(ra, dec, self.radius)[0])
+        sep, alt, score = [a[0] for a in self.scores(ra, dec, utc, stars)]
+        order = np.argsort(score, kind='stable')[:n]
+        order = order[np.isfinite(score[order])]
+        return self._result(stars[order], sep[order], alt[order],
+                            score[order])
+
+    def best(self, ra, dec, utc=None, chunk=1024):
+        """ The best star for each of many targets, RA/Dec arrays in
+        degrees at utc (an array of times or one, now if None), worked in
+        chunks of targets to bound memory
+        Returns: a numpy record array with STAR_FIELDS per target, row -1
+        and score inf for targets with no usable star"""
+        ra = np.atleast_1d(np.asarray(ra, dtype=float))
+        dec = np.atleast_1d(np.asarray(dec, dtype=float))
+        utc = np.broadcast_to(time.time() if utc is None else utc, ra.shape)
+        res = np.zeros(len(ra), dtype=STAR_FIELDS).view(np.recarray)
+        if not len(self.rows):
+            res.row = -1
+            res.score = np.inf
+            return res
+        if len(self.rows) > MATRIX_STARS:
+            for i in range(len(ra)):
+                one = self.select(ra[i], dec[i], utc[i], 1)
+                res[i] = one[0] if len(one) else (-1, '', 0, 0., 0., 0., 0.,
+                                                  0., np.inf)
+            return res
+        for i in range(0, len(ra), chunk):
+            part = slice(i, i + chunk)
+            sep, alt, score = self.scores(ra[part], dec[part], utc[part])
+            k = np.argmin(score, axis=1)
+            t = np.arange(len(k))
+            res[part] = self._result(k, sep[t, k], alt[t, k], score[t, k])
+        none = ~np.isfinite(res.score)
+        res.row[none] = -1
+        return res
@@ -0,0 +1,248 @@
+#!/usr/bin/env python
+# -----------------------------------------------------------------------------
+# Name:        Catalog.py
+# Purpose:     Offline object catalog for LX200 Library lookups
+#
+# Author(s):   R J Schumacher
+#
+# Created:     2026/10/19
+# RCS-ID:      $Id: Catalog.py $
+# Copyright:   (c) 2026
+# Licence:     LGPL
+#
+# -----------------------------------------------------------------------------
+"""
+A local copy of the handbox catalogs, so objects can be located without
+selecting them on the scope first.
+
+A catalog is a directory of raw little-endian column files, one value per
+object, described by catalog.cfg; names are one utf-8 blob with offsets.
+Every column is memory-mapped when the catalog is opened, so opening costs
+nothing however big it is, and processes sharing it share the page cache.
+Per catalog a dense number -> row index gives O(1) lookup.
+
+from LX200.Catalog import Catalog, CatalogWriter
+writer = CatalogWriter('objects')
+writer.append({'catalog': 'M', 'number': [31, 42], 'ra': [10.68, 83.82],
+               'dec': [41.27, -5.39], 'name': ['Andromeda', 'Orion']})
+writer.close()
+cat = Catalog('objects')
+ra, dec = cat.position('M', 31)
+library.catalog = cat   # Library.locate then answers from it
+
+Needs numpy.
+"""
+
+import configparser
+import os
+import numpy as np
+from .LX200Error import LX200Error
+from .Library import DEEP_SKY_LIBRARIES, STAR_CATALOGS
+
+# name, library select command, and number for Lo (deep sky) or Ls (stars)
+CATALOGS = ((('M', 'LM', None),) +
+            tuple([(c, 'LC', i) for i, c in enumerate(DEEP_SKY_LIBRARIES)]) +
+            tuple([(c, 'LS', i) for i, c in enumerate(STAR_CATALOGS)]))
+CATALOG_CODES = dict([(c[0], i) for i, c in enumerate(CATALOGS)])
+# object classes, the first five as in the FIND/BROWSE search string GPDCO
+OBJECT_TYPES = ('', 'Galaxy', 'Planetary Nebula', 'Diffuse Nebula',
+                'Globular Cluster', 'Open Cluster', 'Star', 'Double Star',
+                'Variable Star', 'Other')
+COLUMNS = (('catalog', '<u1'), ('number', '<i4'), ('ra', '<f8'),
+           ('dec', '<f8'), ('mag', '<f4'), ('size', '<f4'), ('type', '<u1'))
+DEFAULTS = {'mag': np.nan, 'size': np.nan, 'type': 0}
+CONFIG = 'catalog.cfg'
+
+
+def catalog_code(catalog):
+    """The catalog column code of a catalog name or code"""
+    if catalog in CATALOG_CODES:
+        return CATALOG_CODES[catalog]
+    if isinstance(catalog, int) and 0 <= catalog < len(CATALOGS):
+        return catalog
+    raise LX200Error("unknown catalog: %s" % catalog)
+
+
+class CatalogWriter:
+    """Builds a catalog directory from chunks of columns, appending to the
+    column files as it goes so memory stays bounded by the chunk size"""
+
+    def __init__(self, path, resume=None):
+        """Constructor.
+        Arguments: the catalog directory, created if needed; any catalog
+        already in it is replaced, unless resume is the number of rows of
+        it to keep and append to (as after an interrupted harvest)
+        """
+        self.path = path
+        if not os.path.isdir(path):
+            os.makedirs(path)
+        self.rows = resume or 0
+        self.nameBytes = 0
+        mode = 'wb' if resume is None else 'ab'
+        self.files = dict([(name, open(self._file(name), mode))
+                           for name, dtype in COLUMNS])
+        self.names = open(self._file('names'), mode)
+        self.offsets = open(self._file('name_offsets'), mode)
+        if resume is None:
+            self.offsets.write(np.zeros(1, '<i8').tobytes())
+            return
+        offsets = np.fromfile(self._file('name_offsets'), '<i8')
+        if len(offsets) <= self.rows:
+            raise LX200Error("catalog in %s has fewer than %d rows" %
+                             (path, self.rows))
+        self.nameBytes = int(offsets[self.rows])
+        # drop anything written after the rows kept
+        for name, dtype in COLUMNS:
+            self.files[name].truncate(self.rows * np.dtype(dtype).itemsize)
+        self.offsets.truncate((self.rows + 1) * 8)
+        self.names.truncate(self.nameBytes)
+
+    def _file(self, name):
+        return os.path.join(self.path, name + '.bin')
+
+    def append(self, chunk):
+        """ Appends a chunk: a dict of equal length columns (lists or
+        arrays) from COLUMNS, and optionally 'name'. 'catalog' may be
+        names or codes, or one for the whole chunk; ra/dec are degrees.
+        Missing mag/size/type default to nan/nan/0"""
+        n = len(chunk['number'])
+        for name, dtype in COLUMNS:
+            value = chunk.get(name, DEFAULTS.get(name))
+            if value is None:
+                raise LX200Error("catalog chunk without %s" % name)
+            if name == 'catalog':
+                if isinstance(value, (str, int)):
+                    value = [value]
+                value = [catalog_code(c) for c in value]
+            col = np.asarray(value, dtype=dtype)
+            if col.ndim == 0 or len(col) == 1:
+                col = np.resize(col, n)
+            if len(col) != n:
+                raise LX200Error("catalog column %s has %d rows, not %d" %
+                                 (name, len(col), n))
+            self.files[name].write(col.tobytes())
+        names = chunk.get('name')
+        if names is None:
+            names = [''] * n
+        blobs = [str(s).encode('utf-8') for s in names]
+        self.names.write(b''.join(blobs))
+        ends = self.nameBytes + np.cumsum([len(b) for b in blobs],
+                                          dtype='<i8')
+        self.offsets.write(ends.astype('<i8').tobytes())
+        if n:
+            self.nameBytes = int(ends[-1])
+        self.rows += n
+
+    def flush(self):
+        """ Pushes everything appended so far to disk"""
+        for f in list(self.files.values()) + [self.names, self.offsets]:
+            f.flush()
+            os.fsync(f.fileno())
+
+    def close(self, index=True):
+        """ Finishes the column files, builds the lookup indexes and writes
+        catalog.cfg; with index False only closes the files, to append to
+        later (see resume)
+        Returns: the number of objects"""
+        for f in list(self.files.values()) + [self.names, self.offsets]:
+            f.close()
+        if not index:
+            return self.rows
+        codes = np.fromfile(self._file('catalog'), '<u1')
+        numbers = np.fromfile(self._file('number'), '<i4')
+        config = configparser.ConfigParser()
+        config.optionxform = str
+        config['Catalog'] = {'rows': str(self.rows)}
+        config['columns'] = dict(COLUMNS)
+        config['indexes'] = {}
+        for code, entry in enumerate(CATALOGS):
+            rows = np.nonzero(codes == code)[0]
+            if not len(rows):
+                continue
+            index = np.full(int(numbers[rows].max()) + 1, -1, '<i4')
+            index[numbers[rows]] = rows
+            index.tofile(self._file('index_' + entry[0]))
+            config['indexes'][entry[0]] = str(len(index))
+        with open(os.path.join(self.path, CONFIG), 'w') as f:
+            config.write(f)
+        return self.rows
+
+
+class Catalog:
+    """Read-only memory-mapped catalog, see CatalogWriter"""
+
+    def __init__(self, path):
+        """Constructor.
+        Arguments: a catalog directory written by CatalogWriter
+        """
+        self.path = path
+        config = configparser.ConfigParser()
+        config.optionxform = str
+        if not config.read(os.path.join(path, CONFIG)):
+            raise LX200Error("no catalog in %s" % path)
+        self.rows = config.getint('Catalog', 'rows')
+        self.columns = {}
+        for name, dtype in config.items('columns'):
+            self.columns[name] = self._map(name, dtype, self.rows)
+        self.indexes = {}
+        for name, size in config.items('indexes'):
+            self.indexes[CATALOG_CODES[name]] = self._map('index_' + name,
+                                                          '<i4', int(size))
+        self.offsets = self._map('name_offsets', '<i8', self.rows + 1)
+        self.names = self._map('names', '<u1', int(self.offsets[-1]))
+
+    def _map(self, name, dtype, size):
+        if not size:
+            return np.zeros(0, dtype)
+        return np.memmap(os.path.join(self.path, name + '.bin'), dtype=dtype,
+                         mode='r', shape=(size,))
+
+    def __repr__(self):
+        """Return a representation string.
+        """
+        return "<LX200 Catalog %s, %d objects>" % (self.path, self.rows)
+
+    def __len__(self):
+        return self.rows
+
+    def __getattr__(self, name):
+        # whole columns as arrays: cat.ra, cat.dec, cat.mag ...
+        columns = self.__dict__.get('columns', {})
+        if name in columns:
+            return columns[name]
+        raise AttributeError(name)
+
+    def lookup(self, catalog, number):
+        """ Row of an object, -1 if it is not in the catalog"""
+        index = self.indexes.get(catalog_code(catalog))
+        if index is None or not 0 <= number < len(index):
+            return -1
+        return int(index[number])
+
+    def name(self, row):
+        return bytes(self.names[self.offsets[row]:self.offsets[row + 1]]
+                     ).decode('utf-8')
+
+    def position(self, catalog, number):
+        """ RA and Dec in degrees of an object
+        Raises LX200Error if it is not in the catalog"""
+        row = self.lookup(catalog, number)
+        if row < 0:
+            raise LX200Error("%s %s not in catalog" % (catalog, number))
+        return float(self.columns['ra'][row]), float(self.columns['dec'][row])
+
+    def get(self, catalog, number):
+        """ All columns of an object as a dict, None if not in the
+        catalog"""
+        row = self.lookup(catalog, number)
+        if row < 0:
+            return None
+        return self.row(row)
+
+    def row(self, row):
+        obj = dict([(name, col[row].item())
+                    for name, col in self.columns.items()])
+        obj['catalog'] = CATALOGS[obj['catalog']][0]
+        obj['type'] = OBJECT_TYPES[obj['type']]
+        obj['name'] = self.name(row)
+        return obj
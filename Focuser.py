@@ -12,27 +12,57 @@
 #
 # -----------------------------------------------------------------------------
 
+import configparser
+import sys
+import threading
+import time
+from collections import deque, namedtuple
+from .LX200Error import LX200Error
+
+# a finished timed move: direction '+' in or '-' out, seconds asked for and
+# seconds from the start to the stop command being written
+FocusMove = namedtuple('FocusMove', 'direction speed requested achieved '
+                                    'cancelled')
+
 
 class Focuser:
     """LX200 class for Focuser movement and properties
 
+    Timed moves run on a background thread against a monotonic deadline:
+    it sleeps until spin seconds before the deadline, then holds the port
+    lock so no other command can be in flight, and spins until the deadline
+    to send the stop. Each move is logged in self.moves.
     """
 
     def __init__(self, comPort, debug=False):
         """Constructor.
-        Arguments:
+        Arguments: an LXSerial
         """
         self.comPort = comPort
+        self.spin = .005  # seconds before the deadline to stop sleeping
+        self.moves = deque(maxlen=100)  # recent FocusMoves, newest last
+        self.cancel = threading.Event()
+        self.thread = None
+        self.error = None
 
     def __repr__(self):
         """Return a representation string.
         """
         return "<LX200 Focuser instance>"
 
+    @property
+    def model(self):
+        return self.comPort.model
+
+    @property
+    def IsMoving(self):
+        """ True while a timed move is running"""
+        return self.thread is not None and self.thread.is_alive()
+
     # -------------------------------------------------------------------------------
     # F - Focuser Control
     # -------------------------------------------------------------------------------
-    def Move(Position):
+    def Move(self, Position):
         """Position (Long) Step distance
         Return (Nothing) Does not return a value.
         Remarks
@@ -42,12 +72,14 @@ class Focuser:
         If the Absolute property is False, then this is a relative positioning
         focuser. The Move command tells the focuser to move in a relative direction,
         and the Position property is an integer between minus MaxIncrement and plus
-        MaxIncrement. """
+        MaxIncrement.
+        Here a step is a second of slowest speed motion, and the move runs
+        in the background, see wait and Halt. """
         # add speed compensation...
         if Position > 0:
             self.focus_in(speed=1, t=Position)
         elif Position < 0:
-            self.focus_out(speed=1, t=Position)
+            self.focus_out(speed=1, t=-Position)
         return None
 
     def SetupDialog(self, fileName='Focuser.cfg'):
@@ -56,55 +88,101 @@ class Focuser:
         set.
         No dialog, just read config...
         """
-        import configParser
         # start the Configparser module
-        self.config = ConfigParser.ConfigParser()
+        self.config = configparser.ConfigParser()
         self.config.read(fileName)
 
+    def _set_speed(self, speed):
+        if self.model == 'LX200GPS':
+            self.focus_speed(speed)
+        elif speed in [1, 2]:
+            self.focus_slow()
+        elif speed in [3, 4]:
+            self.focus_fast()
+        else:
+            raise LX200Error(
+                "unsupported speed: %s for focuser" % speed)
+
     def focus_in(self, speed=1, t=0):
         """ Start Focuser moving inward (toward objective)
+        t > 0 stops it after t seconds, without blocking, see timed_move
         Returns: None"""
-        if speed:
-            if self.model != 'LX200GPS':
-                self.focus_speed(speed)
-            elif speed in [1, 2]:
-                self.focus_slow()
-            elif speed in [3, 4]:
-                self.focus_fast()
-            else:
-                raise LX200Error(
-                    "unsupported speed: " +
-                    speed +
-                    " for focusser")
-        self.comPort.CommandBlind("F+")
-        if t:
-            time.sleep(t)
-            self.Halt()
-
-    def focus_out(self):
+        self.timed_move('+', speed, t)
+
+    def focus_out(self, speed=1, t=0):
         """ Start Focuser moving outward (away from objective)
+        t > 0 stops it after t seconds, without blocking, see timed_move
         Returns: None"""
+        self.timed_move('-', speed, t)
+
+    def timed_move(self, direction, speed=1, t=0):
+        """ Sets speed (unless 0) and starts the focuser moving in direction,
+        '+' in or '-' out. With t seconds, returns at once and a background
+        thread sends the stop at the deadline; Halt cancels the move early
+        and wait waits for it
+        Raises LX200Error if a timed move is already running"""
+        if direction not in ['+', '-']:
+            raise LX200Error("direction not in ['+','-']")
+        if self.IsMoving:
+            raise LX200Error("focuser is already moving")
         if speed:
-            if self.model != 'LX200GPS':
-                self.focus_speed(speed)
-            elif speed in [1, 2]:
-                self.focus_slow()
-            elif speed in [3, 4]:
-                self.focus_fast()
-            else:
-                raise LX200Error(
-                    "unsupported speed: " +
-                    speed +
-                    " for focusser")
-        self.comPort.CommandBlind("F-")
-        if t:
-            time.sleep(t)
-            self.focus_stop()
+            self._set_speed(speed)
+        if not t:
+            self.comPort.CommandBlind("F" + direction)
+            return
+        self.cancel.clear()
+        self.error = None
+        self.thread = threading.Thread(target=self._run,
+                                       args=(direction, speed, t),
+                                       name='Focuser')
+        self.thread.daemon = True
+        self.thread.start()
+
+    def _run(self, direction, speed, t):
+        try:
+            self.run(direction, speed, t)
+        except BaseException:
+            self.error = sys.exc_info()[1]
+
+    def run(self, direction, speed, t):
+        """ Makes a timed move, blocking, see timed_move
+        Returns: the FocusMove logged"""
+        lock = self.comPort.lock
+        with lock:
+            self.comPort.CommandBlind("F" + direction)
+            started = time.monotonic()
+        deadline = started + t
+        cancelled = self.cancel.wait(max(deadline - self.spin -
+                                         time.monotonic(), 0))
+        with lock:
+            while not cancelled and time.monotonic() < deadline:
+                cancelled = self.cancel.is_set()
+            self.comPort.CommandBlind("FQ")
+            achieved = time.monotonic() - started
+        move = FocusMove(direction, speed, t, achieved, cancelled)
+        self.moves.append(move)
+        return move
+
+    def wait(self, timeout=None):
+        """ Waits for a timed move to finish
+        Returns: its FocusMove, None if still moving
+        Raises the error that stopped the move, if any"""
+        if self.thread is not None:
+            self.thread.join(timeout)
+        if self.error is not None:
+            raise LX200Error("focuser move failed: %s" % self.error)
+        if self.IsMoving or not self.moves:
+            return None
+        return self.moves[-1]
 
     def Halt(self):
-        """ Halt Focuser Motion
+        """ Halt Focuser Motion, cancelling any timed move
         Returns: Nothing"""
-        self.comPort.CommandBlind("FQ")
+        if self.IsMoving:
+            self.cancel.set()
+            self.wait()
+        else:
+            self.comPort.CommandBlind("FQ")
         return None
 
     def focus_fast(self):
@@ -125,5 +203,5 @@ class Focuser:
             raise LX200Error(
                 "unsupported model: " +
                 self.model +
-                " for Optical Tube Assembly Temperature")
+                " for focus_speed")
         self.comPort.CommandBlind("F", speed)
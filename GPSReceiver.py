@@ -0,0 +1,239 @@
+#!/usr/bin/env python
+# -----------------------------------------------------------------------------
+# Name:        GPSReceiver.py
+# Purpose:     External NMEA GPS receiver for LX200 time and site setup
+#
+# Author(s):   R J Schumacher
+#
+# Created:     2026/10/19
+# RCS-ID:      $Id: GPSReceiver.py $
+# Copyright:   (c) 2026
+# Licence:     LGPL
+#
+# -----------------------------------------------------------------------------
+"""
+Reads a GPS receiver on a second serial port (or pty) on its own thread,
+and sets the scope's site and clock from it, instead of the handbox's own
+multi-minute gT update:
+
+from LX200.GPSReceiver import GPSReceiver
+gps = GPSReceiver(scope, 'COM3', baud=4800)
+gps.start()
+gps.wait_fix(60)
+gps.set_sentence_delay(.12)  # from the receiver's docs, if it has no PPS
+gps.sync()          # latitude, longitude, UTC offset, then local time
+gps.stop()
+
+The receiver clock is the UTC of each valid RMC sentence against the host
+time the second it names began. That is the host time of the last pulse
+given to mark_pps, for a receiver with a PPS-like output. Without one it
+is the arrival of the first byte of the sentence burst the RMC is in, less
+sentenceDelay, the receiver's lag from the second to the burst. The lag is
+measured while pulses are given, or may be set from the receiver's
+documentation; until it is known the clock is only good to that lag (tens
+to hundreds of milliseconds), and set_time refuses unless told coarse.
+To set the handbox clock the scope port round trip is measured, and SL is
+sent that half round trip before the second it names begins, so with PPS
+or a measured lag the handbox lands within a few milliseconds of it.
+"""
+
+import math
+import threading
+import time
+from collections import deque
+import serial
+from .LX200Error import LX200Error
+from .LXGPS import NMEAParser, GGA, RMC
+
+BURST_GAP = .2  # seconds of silence that end a receiver's sentence burst
+
+
+class GPSReceiver:
+    """External NMEA receiver feeding a Telescope's site and clock"""
+
+    def __init__(self, scope, port=None, baud=4800, device=None,
+                 utcOffset=None, history=100):
+        """Constructor.
+        Arguments: a Telescope to set; port and baud of the receiver, or
+        device an open file-like object to read NMEA from; utcOffset the
+        hours to add to local time for UTC (from the host's zone if None)
+        """
+        if device is None:
+            if port is None:
+                raise LX200Error("GPSReceiver needs a port or device")
+            try:
+                device = serial.Serial(port=port, baudrate=baud, timeout=1)
+            except serial.SerialException as s:
+                raise LX200Error(str(s))
+        self.scope = scope
+        self.device = device
+        self.utcOffset = utcOffset
+        self.nmea = NMEAParser(history)
+        # seconds from the start of a receiver second to its sentence burst;
+        # calibrated once known, measured against PPS or set by the caller
+        self.sentenceDelay = 0.
+        self.calibrated = False
+        self.delays = deque(maxlen=15)  # measured burst lags, see feed
+        self.burstStart = None  # host time of the current burst's first byte
+        self.lastData = None
+        self.clockOffset = None  # receiver UTC - host time.time()
+        self.lat = self.long = self.altitude = None
+        self.ppsTime = None
+        self.rtt = None
+        self.fixed = threading.Event()
+        self.cancel = threading.Event()
+        self.thread = None
+        self.error = None
+
+    def __repr__(self):
+        """Return a representation string.
+        """
+        return "<LX200 GPSReceiver instance, lat %s long %s>" % (self.lat,
+                                                                self.long)
+
+    # -------------------------------------------------------------------------------
+    # receiver
+    # -------------------------------------------------------------------------------
+
+    def mark_pps(self, hostTime=None):
+        """ Records the host time (now if None) of a pulse marking the
+        start of a receiver second"""
+        self.ppsTime = time.time() if hostTime is None else hostTime
+
+    def set_sentence_delay(self, delay):
+        """ Sets the receiver's lag from the start of a second to its
+        sentence burst, in seconds, for use without PPS"""
+        self.sentenceDelay = delay
+        self.calibrated = True
+
+    def feed(self, data, received=None):
+        """ Parses receiver data that arrived at host time received (now if
+        None), updating the clock offset and position. Data after
+        BURST_GAP seconds of silence starts a new sentence burst, so data
+        should be fed as it arrives"""
+        received = time.time() if received is None else received
+        if self.lastData is None or received - self.lastData > BURST_GAP:
+            self.burstStart = received
+        self.lastData = received
+        for record in self.nmea.feed(data):
+            if isinstance(record, RMC) and record.valid and \
+                    record.time is not None:
+                if self.ppsTime is not None and \
+                        self.burstStart - 1. < self.ppsTime <= self.burstStart:
+                    edge = self.ppsTime
+                    self.delays.append(self.burstStart - self.ppsTime)
+                    self.sentenceDelay = sorted(self.delays)[
+                        len(self.delays) // 2]
+                    self.calibrated = True
+                else:
+                    edge = self.burstStart - self.sentenceDelay
+                self.clockOffset = record.time - edge
+            elif isinstance(record, GGA) and record.quality > 0:
+                self.lat, self.long = record.lat, record.long
+                self.altitude = record.altitude
+            if self.clockOffset is not None and self.lat is not None:
+                self.fixed.set()
+
+    def run(self, cancel=None):
+        """ Reads the receiver until cancel (a threading.Event) is set"""
+        cancel = cancel or self.cancel
+        while not cancel.is_set():
+            data = self.device.read(max(1, getattr(self.device, 'in_waiting',
+                                                   0)))
+            if data:
+                self.feed(data)
+
+    def _run(self):
+        try:
+            self.run()
+        except BaseException as e:
+            self.error = e
+
+    def start(self):
+        """ Reads the receiver on a background thread"""
+        if self.thread is not None and self.thread.is_alive():
+            return
+        self.cancel.clear()
+        self.error = None
+        self.thread = threading.Thread(target=self._run, name='GPSReceiver')
+        self.thread.daemon = True
+        self.thread.start()
+
+    def stop(self, timeout=None):
+        """ Stops the background reading"""
+        self.cancel.set()
+        if self.thread is not None:
+            self.thread.join(timeout)
+
+    def wait_fix(self, timeout=None):
+        """ Waits for a time and position fix
+        Raises LX200Error on timeout"""
+        if not self.fixed.wait(timeout):
+            raise LX200Error("no GPS fix in %s seconds" % timeout)
+
+    def utc(self):
+        """ Receiver UTC now, as unix seconds"""
+        if self.clockOffset is None:
+            raise LX200Error("no GPS time yet")
+        return time.time() + self.clockOffset
+
+    def utc_offset(self):
+        """ Hours to add to local time for UTC: utcOffset, or the host's"""
+        if self.utcOffset is not None:
+            return self.utcOffset
+        dst = time.localtime().tm_isdst > 0 and time.daylight
+        return (time.altzone if dst else time.timezone) / 3600.
+
+    # -------------------------------------------------------------------------------
+    # scope
+    # -------------------------------------------------------------------------------
+
+    def measure_rtt(self, samples=5):
+        """ Shortest of samples scope port round trips (a GL query), in
+        seconds, kept in self.rtt"""
+        best = None
+        for i in range(samples):
+            t0 = time.perf_counter()
+            self.scope.comPort.CommandString("GL")
+            dt = time.perf_counter() - t0
+            best = dt if best is None else min(best, dt)
+        self.rtt = best
+        return best
+
+    def _wait_until(self, hostTime, spin=.002):
+        """ sleeps, then spins for the last spin seconds, until host time"""
+        deadline = time.monotonic() + (hostTime - time.time())
+        while True:
+            left = deadline - time.monotonic()
+            if left <= 0:
+                return
+            if left > spin:
+                time.sleep(left - spin)
+
+    def set_time(self, margin=.05, coarse=False):
+        """ Sets the handbox local time from the receiver, sent half a
+        measured round trip before the second it names begins. Without PPS
+        or a calibrated sentenceDelay the receiver clock may be late by the
+        receiver's sentence lag: refused unless coarse
+        Returns: True if accepted"""
+        if not self.calibrated and not coarse:
+            raise LX200Error("GPS clock not calibrated: use mark_pps or "
+                             "set_sentence_delay, or pass coarse=True")
+        rtt = self.measure_rtt() if self.rtt is None else self.rtt
+        offset = self.utc_offset()
+        # the first whole second there is time to reach
+        second = math.ceil(self.utc() + rtt / 2. + margin)
+        self._wait_until(second - rtt / 2. - self.clockOffset)
+        return self.scope.set_local_time(time.gmtime(second - offset * 3600.))
+
+    def sync(self, coarse=False):
+        """ Sets the scope's site latitude and longitude, UTC offset and
+        local time from the receiver, the time last; coarse as for set_time
+        Returns: True if all were accepted"""
+        if self.lat is None or self.clockOffset is None:
+            raise LX200Error("no GPS fix yet")
+        self.scope.set_site_latitude(self.lat)
+        self.scope.set_site_longitude(self.long)
+        ok = self.scope.set_UTC_offset(self.utc_offset())
+        self.rtt = None  # measure again, right before the time is sent
+        return self.set_time(coarse=coarse) and ok
@@ -0,0 +1,228 @@
+#!/usr/bin/env python
+# -----------------------------------------------------------------------------
+# Name:        Harvester.py
+# Purpose:     Resumable dump of the LX200 object library to a local Catalog
+#
+# Author(s):   R J Schumacher
+#
+# Created:     2026/10/19
+# RCS-ID:      $Id: Harvester.py $
+# Copyright:   (c) 2026
+# Licence:     LGPL
+#
+# -----------------------------------------------------------------------------
+"""
+Copies the handbox's own object database into a local Catalog, in the
+background and a few objects per port exchange:
+
+from LX200.Harvester import Harvester
+harvest = Harvester(library, 'objects', catalogs=('M', 'NGC', 'SAO'))
+harvest.start()          # background thread, rate objects per second
+...
+harvest.stop()           # or a disconnect; a new Harvester on the same
+                         # directory carries on from the checkpoint
+
+Each object is selected, and its info string (LI) and coordinates (Gr, Gd)
+read, in one pipelined write per batch of objects. After every batch the
+catalog files are flushed and harvest.cfg records how far it got. The port
+lock is only held for a batch, so other commands get through in between.
+
+Needs numpy.
+"""
+
+import configparser
+import os
+import re
+import sys
+import threading
+from .LX200Error import LX200Error
+from .LX200Utils import to_float
+from .LXSerial import BLIND, STRING
+from .Catalog import CATALOGS, CATALOG_CODES, OBJECT_TYPES, CatalogWriter
+
+CHECKPOINT = 'harvest.cfg'
+# highest object number per catalog
+CATALOG_SIZES = {'M': 110, 'NGC': 7840, 'IC': 5386, 'UGC': 12921,
+                 'Caldwell': 109, 'Arp': 338, 'Abell': 2712, 'STAR': 351,
+                 'SAO': 258997, 'GCVS': 28484, 'Hipparcos': 118218,
+                 'HR': 9110, 'HD': 359083}
+# object type abbreviations in the LI info string
+INFO_TYPES = {'GAL': 'Galaxy', 'PLN': 'Planetary Nebula',
+              'DIF': 'Diffuse Nebula', 'GLB': 'Globular Cluster',
+              'OPN': 'Open Cluster', 'DBL': 'Double Star',
+              'VAR': 'Variable Star'}
+INFO_MAG = re.compile(r'MAG\s*(-?\d+(?:\.\d*)?)')
+INFO_SIZE = re.compile(r'SZ\s*(\d+(?:\.\d*)?)')
+
+
+def parse_info(info, catalog):
+    """ Magnitude, size in arc minutes (nan if not given) and OBJECT_TYPES
+    code from an LI info string such as " M31 EX GAL MAG 3.5 SZ178.0'" """
+    mag = INFO_MAG.search(info)
+    size = INFO_SIZE.search(info)
+    kind = 'Star' if CATALOGS[CATALOG_CODES[catalog]][1] == 'LS' else ''
+    for word in info.split():
+        if word in INFO_TYPES:
+            kind = INFO_TYPES[word]
+            break
+    return (float(mag.group(1)) if mag else float('nan'),
+            float(size.group(1)) if size else float('nan'),
+            OBJECT_TYPES.index(kind))
+
+
+class Harvester:
+    """Background, resumable copy of the scope's object library into a
+    Catalog directory"""
+
+    def __init__(self, library, path, catalogs=('M',), sizes=None, batch=8,
+                 rate=4.):
+        """Constructor.
+        Arguments: a Library instance, the catalog directory, the catalogs
+        to copy (names from Catalog.CATALOGS), sizes a dict overriding
+        CATALOG_SIZES, batch the objects per port exchange and rate the
+        objects per second to read at most
+        """
+        for c in catalogs:
+            if c not in CATALOG_CODES:
+                raise LX200Error("unknown catalog: %s" % c)
+        self.library = library
+        self.path = path
+        self.catalogs = list(catalogs)
+        self.sizes = dict(CATALOG_SIZES)
+        self.sizes.update(sizes or {})
+        self.batch = batch
+        self.rate = rate
+        self.thread = None
+        self.cancel = threading.Event()
+        self.error = None
+        self.load_checkpoint()
+
+    def __repr__(self):
+        """Return a representation string.
+        """
+        return "<LX200 Harvester instance, %s %s, %d objects>" % (
+            self.catalog, self.next, self.rows)
+
+    # -------------------------------------------------------------------------------
+    # checkpoint
+    # -------------------------------------------------------------------------------
+
+    def load_checkpoint(self):
+        """ Reads where an earlier harvest into path stopped, if any"""
+        config = configparser.ConfigParser()
+        if config.read(os.path.join(self.path, CHECKPOINT)):
+            self.catalog = config.get('harvest', 'catalog') or None
+            self.next = config.getint('harvest', 'next')
+            self.rows = config.getint('harvest', 'rows')
+        else:
+            self.catalog = self.catalogs[0] if self.catalogs else None
+            self.next = 1
+            self.rows = None
+
+    def save_checkpoint(self):
+        config = configparser.ConfigParser()
+        config['harvest'] = {'catalog': self.catalog or '',
+                             'next': str(self.next),
+                             'rows': str(self.rows or 0)}
+        name = os.path.join(self.path, CHECKPOINT)
+        with open(name + '.tmp', 'w') as f:
+            config.write(f)
+        os.replace(name + '.tmp', name)
+
+    @property
+    def finished(self):
+        return self.catalog is None
+
+    # -------------------------------------------------------------------------------
+    # harvesting
+    # -------------------------------------------------------------------------------
+
+    def select_catalog(self, catalog):
+        """ Selects the deep sky library or star catalog of catalog"""
+        select, num = CATALOGS[CATALOG_CODES[catalog]][1:]
+        if select == 'LC' and not self.library.set_library(num):
+            raise LX200Error("library %s not available" % catalog)
+        if select == 'LS' and self.library.set_star_catalog(num) == '2':
+            raise LX200Error("star catalog %s not available" % catalog)
+
+    def read_batch(self, catalog, numbers):
+        """ Selects and reads objects numbers of catalog in one pipelined
+        exchange, skipping those the scope has no info for
+        Returns: a chunk for CatalogWriter.append"""
+        select = CATALOGS[CATALOG_CODES[catalog]][1]
+        cmds = []
+        for num in numbers:
+            cmds += [(BLIND, select, "%4d" % (num)), (STRING, "LI"),
+                     (STRING, "Gr"), (STRING, "Gd")]
+        replies = self.library.comPort.CommandPipeline(cmds)
+        chunk = dict([(k, []) for k in ('number', 'ra', 'dec', 'mag', 'size',
+                                        'type', 'name')])
+        chunk['catalog'] = catalog
+        for i, num in enumerate(numbers):
+            info, ra, dec = replies[4 * i + 1:4 * i + 4]
+            if not info or not info.strip():
+                continue
+            mag, size, kind = parse_info(info, catalog)
+            for k, v in zip(('number', 'ra', 'dec', 'mag', 'size', 'type',
+                             'name'),
+                            (num, to_float(ra) * 15., to_float(dec), mag,
+                             size, kind, info.strip())):
+                chunk[k].append(v)
+        return chunk
+
+    def run(self, cancel=None):
+        """ Harvests until done or cancel (a threading.Event) is set,
+        checkpointing after every batch and pacing to rate
+        Returns: True once every catalog is copied and the catalog is
+        indexed, False if cancelled"""
+        cancel = cancel or self.cancel
+        writer = CatalogWriter(self.path, self.rows)
+        selected = None
+        try:
+            while self.catalog is not None:
+                if cancel.is_set():
+                    return False
+                if selected != self.catalog:
+                    self.select_catalog(self.catalog)
+                    selected = self.catalog
+                last = min(self.next + self.batch, self.sizes[self.catalog] + 1)
+                writer.append(self.read_batch(self.catalog,
+                                              range(self.next, last)))
+                writer.flush()
+                self.rows = writer.rows
+                if last > self.sizes[self.catalog]:
+                    i = self.catalogs.index(self.catalog) + 1
+                    self.catalog = self.catalogs[i] if i < len(self.catalogs) \
+                        else None
+                    self.next = 1
+                else:
+                    self.next = last
+                self.save_checkpoint()
+                if self.rate and self.catalog is not None:
+                    cancel.wait(self.batch / float(self.rate))
+        finally:
+            writer.close(index=self.catalog is None)
+        return True
+
+    def _run(self):
+        try:
+            self.run()
+        except BaseException:
+            self.error = sys.exc_info()[1]
+
+    def start(self):
+        """ Runs the harvest on a background thread; errors (such as a
+        disconnect) stop it and are kept in self.error"""
+        if self.thread is not None and self.thread.is_alive():
+            return
+        self.cancel.clear()
+        self.error = None
+        self.thread = threading.Thread(target=self._run, name='Harvester')
+        self.thread.daemon = True
+        self.thread.start()
+
+    def stop(self, timeout=None):
+        """ Stops the background harvest after the current batch"""
+        self.cancel.set()
+        if self.thread is not None:
+            self.thread.join(timeout)
@@ -0,0 +1,98 @@
+#!/usr/bin/env python
+# -----------------------------------------------------------------------------
+# Name:        Horizon.py
+# Purpose:     Local horizon and slew limit checks for LX200 targets
+#
+# Author(s):   R J Schumacher
+#
+# Created:     2026/10/19
+# RCS-ID:      $Id: Horizon.py $
+# Copyright:   (c) 2026
+# Licence:     LGPL
+#
+# -----------------------------------------------------------------------------
+"""
+Checks whether targets can be slewed to without asking the scope:
+
+from LX200.Horizon import Horizon
+horizon = Horizon(scope, mask=[(0, 15), (90, 25), (180, 10), (270, 20)])
+ok = horizon.reachable(ra, dec)  # numpy arrays of RA/Dec in degrees
+scope.horizon = horizon          # goto then rejects unreachable targets locally
+
+Needs numpy.
+"""
+
+import numpy as np
+from .LX200Utils import *
+from .Telescope import GOTO_OK, GOTO_BELOW_HORIZON, GOTO_ABOVE_LIMIT
+
+
+class Horizon:
+    """Altitude limits for a site: the scope's high/lower slew limits and an
+    optional horizon mask, applied to whole arrays of targets at once"""
+
+    def __init__(self, scope, mask=None):
+        """Constructor.
+        Arguments: a Telescope instance to read the site and limits from,
+        mask a sequence of (azimuth, minimum altitude) points in degrees,
+        azimuth from North through East, interpolated between points
+        """
+        self.scope = scope
+        self.refresh()
+        self.set_mask(mask)
+
+    def __repr__(self):
+        """Return a representation string.
+        """
+        return "<LX200 Horizon instance>"
+
+    def refresh(self):
+        """ (Re)reads latitude, longitude and slew limits from the scope,
+        from the session site cache when it is loaded"""
+        self.lat = to_float(self.scope.get_site_lat())
+        self.long = to_float(self.scope.get_current_long())
+        self.minAlt = to_float(self.scope.get_high_limit())
+        self.maxAlt = to_float(self.scope.get_lower_limit())
+
+    def set_mask(self, mask):
+        """ Sets the horizon mask, None for a flat horizon"""
+        if mask is None:
+            self.maskAz = self.maskAlt = None
+            return
+        mask = np.asarray(sorted(mask), dtype=float)
+        self.maskAz = mask[:, 0] % 360.
+        self.maskAlt = mask[:, 1]
+
+    def mask_altitude(self, az):
+        """ Minimum altitude of the horizon mask at azimuth az (degrees)"""
+        if self.maskAz is None:
+            return np.full(np.shape(az), -90.)
+        return np.interp(np.asarray(az) % 360., self.maskAz, self.maskAlt,
+                         period=360.)
+
+    def lst(self, utc=None):
+        """ Local sidereal time in hours at utc (unix seconds, now if None),
+        from the host clock"""
+        return self.scope.sidereal_time(utc)
+
+    def altaz(self, ra, dec, lst=None):
+        """ Altitude and azimuth in degrees of RA/Dec (degrees, arrays or
+        scalars) at local sidereal time lst (hours, now if None)"""
+        if lst is None:
+            lst = self.lst()
+        return radec_to_altaz(ra, dec, lst, self.lat)
+
+    def status(self, ra, dec, lst=None):
+        """ Slew status per target, as the scope would report it:
+        GOTO_OK, GOTO_BELOW_HORIZON (below the high limit or the mask)
+        or GOTO_ABOVE_LIMIT (above the lower limit)"""
+        alt, az = self.altaz(ra, dec, lst)
+        res = np.full(alt.shape, GOTO_OK, dtype=np.int8)
+        res[alt > self.maxAlt] = GOTO_ABOVE_LIMIT
+        res[(alt < self.minAlt) | (alt < self.mask_altitude(az))] = \
+            GOTO_BELOW_HORIZON
+        return res
+
+    def reachable(self, ra, dec, lst=None):
+        """ True per target that can be slewed to"""
+        return self.status(ra, dec, lst) == GOTO_OK
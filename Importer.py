@@ -0,0 +1,251 @@
+#!/usr/bin/env python
+# -----------------------------------------------------------------------------
+# Name:        Importer.py
+# Purpose:     Streaming import of text star and object catalogs
+#
+# Author(s):   R J Schumacher
+#
+# Created:     2026/10/19
+# RCS-ID:      $Id: Importer.py $
+# Copyright:   (c) 2026
+# Licence:     LGPL
+#
+# -----------------------------------------------------------------------------
+"""
+Builds a local Catalog from big fixed-width or CSV text catalogs a chunk of
+lines at a time, so memory stays bounded whatever the file size:
+
+from LX200.Importer import TextFormat, import_catalog
+from LX200.Catalog import CatalogWriter
+hip = TextFormat({'number': (8, 14), 'ra': (51, 63), 'dec': (64, 76),
+                  'mag': (41, 46), 'pmra': (87, 95), 'pmdec': (96, 104)},
+                 delimiter=None)
+writer = CatalogWriter('objects')
+counts = {}
+import_catalog('hip_main.dat.gz', hip, 'Hipparcos', writer, faint=8.,
+               epoch=2026.8, catalogEpoch=1991.25, processes=4,
+               counts=counts)      # Hipparcos positions are for J1991.25
+writer.close()
+print(counts['skipped'], 'stars without a position')
+
+The stages are generators, each taking and yielding chunks (dicts of
+column arrays), and can be composed by hand:
+read -> parse -> select (magnitude, region) -> project -> write.
+parse can spread chunks over several processes, keeping at most a few
+chunks in flight; parsing is vectorized, so that only pays when it, and not
+reading the file, is what takes the time. Lines whose RA or Dec is blank or
+does not parse (such as Hipparcos stars with no astrometric solution) are
+skipped and counted, not fatal.
+
+Needs numpy.
+"""
+
+import csv
+import gzip
+import multiprocessing
+from collections import deque
+import numpy as np
+from .LX200Error import LX200Error
+from .LX200Utils import to_float_array, separation_array
+
+FIELDS = ('number', 'ra', 'dec', 'mag', 'size', 'type', 'name', 'pmra',
+          'pmdec')
+
+
+class TextFormat:
+    """Where the columns are in the lines of a text catalog"""
+
+    def __init__(self, fields, delimiter=None, skip=0, comment='#',
+                 raHours=False):
+        """Constructor.
+        Arguments: fields a dict of FIELDS names to (start, end) character
+        slices for fixed-width lines (delimiter None) or to column numbers
+        for delimited ones; skip the header lines; comment the start of
+        lines to ignore; raHours if RA is in hours rather than degrees.
+        ra and dec may be decimal or sexagesimal, pmra (times cos dec) and
+        pmdec are in milli arc seconds per year. number, ra and dec are
+        needed.
+        """
+        for f in fields:
+            if f not in FIELDS:
+                raise LX200Error("unknown catalog field: %s" % f)
+        for f in ('number', 'ra', 'dec'):
+            if f not in fields:
+                raise LX200Error("catalog format needs %s" % f)
+        self.fields = fields
+        self.delimiter = delimiter
+        self.skip = skip
+        self.comment = comment
+        self.raHours = raHours
+
+    def __repr__(self):
+        """Return a representation string.
+        """
+        return "<LX200 TextFormat %s>" % sorted(self.fields)
+
+    def columns(self, lines):
+        """ The text of each field in lines, as numpy string arrays"""
+        if self.delimiter is not None:
+            rows = list(csv.reader(lines, delimiter=self.delimiter))
+            return dict([(f, np.array([r[i] if i < len(r) else ''
+                                       for r in rows]))
+                         for f, i in self.fields.items()])
+        width = max(end for start, end in self.fields.values())
+        text = np.array(lines, dtype='U%d' % width)
+        # characters as a (lines, width) array of code points, 0 padded
+        cp = text.view(np.uint32).reshape(len(lines), width)
+        return dict([(f, np.ascontiguousarray(cp[:, start:end]).view(
+            'U%d' % (end - start)).ravel())
+            for f, (start, end) in self.fields.items()])
+
+
+def _numbers(text, dtype=float, blank=np.nan):
+    text = np.char.strip(text)
+    return np.where(text == '', str(blank), text).astype(dtype)
+
+
+def parse_chunk(lines, fmt):
+    """ Parses a list of lines in TextFormat fmt into a chunk: a dict of
+    column arrays, RA and Dec in degrees, and 'skipped' the number of lines
+    dropped for a position that does not parse. Lines with no number are
+    dropped too, uncounted"""
+    text = fmt.columns(lines)
+    keep = np.char.strip(text['number']) != ''
+    ra = to_float_array(text['ra'], strict=False)
+    dec = to_float_array(text['dec'], strict=False)
+    placed = np.isfinite(ra) & np.isfinite(dec)
+    skipped = int((keep & ~placed).sum())
+    keep &= placed
+    text = dict([(f, t[keep]) for f, t in text.items()])
+    chunk = {'number': _numbers(text['number'], int, 0),
+             'ra': ra[keep], 'dec': dec[keep], 'skipped': skipped}
+    if fmt.raHours:
+        chunk['ra'] *= 15.
+    for f in ('mag', 'size', 'pmra', 'pmdec'):
+        if f in text:
+            chunk[f] = _numbers(text[f])
+    if 'type' in text:
+        chunk['type'] = _numbers(text['type'], int, 0)
+    if 'name' in text:
+        chunk['name'] = np.char.strip(text['name'])
+    return chunk
+
+
+# -------------------------------------------------------------------------------
+# pipeline stages
+# -------------------------------------------------------------------------------
+
+def read(source, fmt, chunk=20000):
+    """ Lists of up to chunk data lines of source, a file name (.gz read
+    compressed) or an iterable of lines, skipping fmt's header and
+    comment lines"""
+    f = source
+    if isinstance(source, str):
+        f = gzip.open(source, 'rt') if source.endswith('.gz') else \
+            open(source)
+    try:
+        lines = []
+        for i, line in enumerate(f):
+            if i < fmt.skip or not line.strip() or \
+                    (fmt.comment and line.startswith(fmt.comment)):
+                continue
+            lines.append(line.rstrip('\r\n'))
+            if len(lines) == chunk:
+                yield lines
+                lines = []
+        if lines:
+            yield lines
+    finally:
+        if f is not source:
+            f.close()
+
+
+def _counted(chunk, counts):
+    skipped = chunk.pop('skipped', 0)
+    if counts is not None:
+        counts['skipped'] = counts.get('skipped', 0) + skipped
+    return chunk
+
+
+def parse(chunks, fmt, processes=None, counts=None):
+    """ Parsed chunks of lists of lines, in order. With processes, parsing
+    is spread over a pool of that many worker processes, with at most two
+    chunks each in flight. Lines skipped for a position that does not
+    parse are added up in counts['skipped'], given a dict"""
+    if not processes:
+        for lines in chunks:
+            yield _counted(parse_chunk(lines, fmt), counts)
+        return
+    pool = multiprocessing.Pool(processes)
+    try:
+        pending = deque()
+        for lines in chunks:
+            pending.append(pool.apply_async(parse_chunk, (lines, fmt)))
+            if len(pending) >= 2 * processes:
+                yield _counted(pending.popleft().get(), counts)
+        while pending:
+            yield _counted(pending.popleft().get(), counts)
+    finally:
+        pool.terminate()
+
+
+def select(chunks, bright=None, faint=None, region=None):
+    """ Chunks cut to the objects no brighter than bright, no fainter than
+    faint (objects with no magnitude are kept) and within region, an (RA,
+    Dec, radius) cone in degrees"""
+    for chunk in chunks:
+        keep = np.ones(len(chunk['number']), dtype=bool)
+        if 'mag' in chunk:
+            if bright is not None:
+                keep &= ~(chunk['mag'] < bright)
+            if faint is not None:
+                keep &= ~(chunk['mag'] > faint)
+        if region is not None:
+            keep &= separation_array(chunk['ra'], chunk['dec'],
+                                     region[0], region[1]) <= region[2]
+        if not keep.all():
+            chunk = dict([(f, c[keep]) for f, c in chunk.items()])
+        if len(chunk['number']):
+            yield chunk
+
+
+def project(chunks, catalog, epoch=None, catalogEpoch=2000.):
+    """ Chunks ready for CatalogWriter: tagged with catalog and, given
+    epoch (a decimal year) and proper motions, moved from catalogEpoch to
+    epoch. Proper motion columns are dropped"""
+    for chunk in chunks:
+        chunk['catalog'] = catalog
+        pmra, pmdec = chunk.pop('pmra', None), chunk.pop('pmdec', None)
+        if epoch is not None and pmra is not None and pmdec is not None:
+            years = (epoch - catalogEpoch) / 3.6e6  # mas to degrees
+            cosDec = np.maximum(np.cos(np.radians(chunk['dec'])), 1e-9)
+            chunk['ra'] = (chunk['ra'] + np.nan_to_num(pmra) * years /
+                           cosDec) % 360.
+            chunk['dec'] = np.clip(chunk['dec'] + np.nan_to_num(pmdec) *
+                                   years, -90., 90.)
+        yield chunk
+
+
+def write(chunks, writer):
+    """ Appends chunks to a CatalogWriter
+    Returns: the rows written"""
+    rows = 0
+    for chunk in chunks:
+        writer.append(chunk)
+        rows += len(chunk['number'])
+    return rows
+
+
+def import_catalog(source, fmt, catalog, writer, bright=None, faint=None,
+                   region=None, epoch=None, catalogEpoch=2000.,
+                   processes=None, chunk=20000, counts=None):
+    """ Runs source through every stage into writer (a CatalogWriter,
+    closed by the caller once all catalogs are in), see the stages.
+    counts, a dict, gets 'skipped' the lines with no usable position
+    Returns: the rows written"""
+    if counts is not None:
+        counts.setdefault('skipped', 0)
+    return write(project(select(parse(read(source, fmt, chunk), fmt,
+                                      processes, counts),
+                                bright, faint, region),
+                         catalog, epoch, catalogEpoch), writer)
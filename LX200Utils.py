@@ -22,7 +22,23 @@ class LX200Utils:
 
         pass
 """
+import math
+import re
+import time
+try:
+    import numpy as np
+except ImportError:
+    np = None  # only the array functions need numpy
+from .LX200Error import LX200Error
+
 DEG = chr(223)  # ASCII char for degree
+SIDEREAL_RATE = 1.00273790935  # sidereal seconds per solar second
+# every position format the scope sends: HH:MM.T, HH:MM:SS, sDD*MM,
+# sDD*MM'SS, sDDD*MM, sHH.H, DD* ... with any separators
+_NUM = r'(\d+(?:\.\d*)?)'
+_SEP = r'[^\d.+\-]+'
+SEXAGESIMAL = re.compile(r'([+-]?)%s(?:%s%s(?:%s%s)?)?[^\d]*$' %
+                         (_NUM, _SEP, _NUM, _SEP, _NUM))
 # -------------------------------------------------------------------------------
 # used by Telescope and Library classes, but also useful alone
 # based on code from http://projgalileo.sourceforge.net/
@@ -31,62 +47,400 @@ DEG = chr(223)  # ASCII char for degree
 
 def to_float(resp):
     """Converts a string in base-60 with any separator into a float"""
-    # Split at any nondigit character, then add them up
-    import re
-    nondigit = re.compile(r'[^0-9+-]')
-    if resp[0] != '+' and resp[0] != '-':
-        parts = nondigit.split(str(resp))
-    else:
-        parts = nondigit.split(str(resp[1:]))
-    tot = 0.0
-    mult = 1
-    for part in parts:
-        tot += float(part) / mult
-        mult *= 60
-    if resp[0] == '-':
-        tot -= 2 * tot
+    match = SEXAGESIMAL.match(str(resp).strip())
+    if match is None:
+        raise ValueError("not a sexagesimal value: %r" % resp)
+    sign, d, m, s = match.groups()
+    tot = float(d) + float(m or 0) / 60. + float(s or 0) / 3600.
+    if sign == '-':
+        return -tot
     return tot
 
 
+def to_float_array(resps, strict=True):
+    """to_float for a list or array of responses, into a numpy float array.
+    Scans the characters a column at a time for all responses together, so
+    the Python work depends on the response width, not on their number.
+    Responses that are not sexagesimal values raise ValueError, or are nan
+    if not strict"""
+    _need_numpy()
+    text = np.char.strip(np.asarray(resps, dtype=str)).ravel()
+    n = text.size
+    width = text.dtype.itemsize // 4
+    if n == 0:
+        return np.zeros(np.shape(resps))
+    if width == 0:
+        # all blank
+        if strict:
+            raise ValueError("%d of %d responses are not sexagesimal values" %
+                             (n, n))
+        return np.full(np.shape(resps), np.nan)
+    cp = text.view(np.uint32).reshape(n, width)  # code points, 0 padded
+    neg = cp[:, 0] == ord('-')
+    signed = neg | (cp[:, 0] == ord('+'))
+    cp = np.where(signed[:, None], np.roll(cp, -1, axis=1), cp)
+    cp[signed, -1] = 0
+    rows = np.arange(n)
+    vals = np.zeros((n, 4))  # degrees, minutes, seconds, overflow
+    field = np.zeros(n, dtype=int)
+    scale = np.zeros(n)  # weight of the next fraction digit, 0 if none
+    sep = np.zeros(n, dtype=bool)  # a separator since the last digit
+    bad = ~((cp[:, 0] >= 48) & (cp[:, 0] <= 57))
+    for j in range(width):
+        c = cp[:, j]
+        digit = (c >= 48) & (c <= 57)
+        dot = c == 46
+        start = digit & sep
+        field = np.minimum(field + start, 3)
+        scale[start] = 0.
+        sep = (sep & ~digit) | (c != 0) & ~digit & ~dot
+        d = c - 48.
+        cur = vals[rows, field]
+        vals[rows, field] = np.where(
+            digit, np.where(scale > 0., cur + d * scale, cur * 10. + d), cur)
+        bad |= dot & (scale > 0.)
+        scale = np.where(dot, .1, np.where(digit, scale / 10., scale))
+    bad |= field > 2
+    if strict and bad.any():
+        raise ValueError("%d of %d responses are not sexagesimal values" %
+                         (bad.sum(), n))
+    tot = vals[:, 0] + vals[:, 1] / 60. + vals[:, 2] / 3600.
+    tot[bad] = np.nan
+    return np.where(neg, -tot, tot).reshape(np.shape(resps))
+
+
 def from_lx200_righta(resp):
     """Converts an lx200 righta response into an angle in degrees"""
-    angle = _to_float(resp)
+    angle = to_float(resp)
     return angle * 360 / 24
 
 
-def to_lx200_righta(angle):
-    """Converts float angle to HH:MM.M"""
-    angle = angle * 24 / 360
-    hours = int(angle)
-    angle -= hours
-    mins = angle * 60
-    return '%02d:%03f' % (hours, mins)
+def to_lx200_righta(angle, high=False):
+    """Converts float angle in degrees to HH:MM.T, or HH:MM:SS if high"""
+    if high:
+        secs = int(angle % 360. * 240. + .5) % 86400
+        return '%02d:%02d:%02d' % (secs // 3600, secs // 60 % 60, secs % 60)
+    tenths = int(angle % 360. * 40. + .5) % 14400
+    return '%02d:%02d.%d' % (tenths // 600, tenths // 10 % 60, tenths % 10)
 
 
 def from_lx200_angle(resp):
     """Converts an lx200 declination response into an angle"""
-    angle = _to_float(resp)
+    angle = to_float(resp)
     return angle
 
 
+def _sign_abs(angle):
+    if angle < 0:
+        return '-', -angle
+    return '+', angle
+
+
 def to_lx200_angle(angle):
     """Converts float angle to sDD*MM"""
-    if angle < 0:
-        angle = -angle
-        sign = '-'
-    else:
+    sign, angle = _sign_abs(angle)
+    mins = int(angle * 60. + .5)
+    if not mins:
         sign = '+'
-    mins = (angle - int(angle)) * 60.0
-    return '%c%02d%c%02d' % (sign, int(angle), DEG, mins)
+    return '%c%02d%c%02d' % (sign, mins // 60, DEG, mins % 60)
 
 
 def to_lx200_long_angle(angle):
     """Converts float angle to sDD*MM:SS"""
-    if angle < 0:
-        angle = -angle
-        sign = '-'
-    else:
+    sign, angle = _sign_abs(angle)
+    secs = int(angle * 3600. + .5)
+    if not secs:
         sign = '+'
-    mins = (angle - int(angle)) * 60.0
-    secs = (mins - int(mins)) * 60.0
-    return '%c%02d%c%02d:%02d' % (sign, int(angle), DEG, mins, secs)
+    return '%c%02d%c%02d:%02d' % (sign, secs // 3600, DEG, secs // 60 % 60,
+                                  secs % 60)
+
+
+class Angle(object):
+    """Immutable angle in degrees, from a float or an LX200 string.
+    The float value, sexagesimal parts and both wire encodings are worked
+    out on first use and kept, so a target that is retried or pipelined is
+    only converted once. Slots keep each instance small for big tables."""
+    __slots__ = ('_text', '_value', '_parts', '_low', '_high')
+
+    def __init__(self, value):
+        if isinstance(value, Angle):
+            value = value.value
+        if isinstance(value, str):
+            self._cache('_text', value)
+            self._cache('_value', None)
+        else:
+            self._cache('_text', None)
+            self._cache('_value', float(value))
+        self._cache('_parts', None)
+        self._cache('_low', None)
+        self._cache('_high', None)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("%s is immutable" % type(self).__name__)
+
+    def __reduce__(self):
+        if self._text is not None:
+            return type(self), (self._text,)
+        return type(self), (self._value,)
+
+    def __repr__(self):
+        return "%s(%r)" % (type(self).__name__, self.value)
+
+    def __eq__(self, other):
+        return type(self) is type(other) and self.value == other.value
+
+    def __hash__(self):
+        return hash((type(self), self.value))
+
+    def __float__(self):
+        return self.value
+
+    def _cache(self, name, value):
+        object.__setattr__(self, name, value)
+        return value
+
+    @property
+    def value(self):
+        """the angle as a float, in its own unit"""
+        if self._value is None:
+            return self._cache('_value', to_float(self._text))
+        return self._value
+
+    @property
+    def degrees(self):
+        return self.value
+
+    @property
+    def parts(self):
+        """(sign, whole units, minutes, seconds) with seconds a float"""
+        if self._parts is None:
+            v = self.value
+            secs = abs(v) * 3600.
+            return self._cache('_parts', ('-' if v < 0 else '+',
+                                          int(secs // 3600),
+                                          int(secs // 60 % 60),
+                                          secs % 60.))
+        return self._parts
+
+    def _encode(self, high):
+        if high:
+            return to_lx200_long_angle(self.value)
+        return to_lx200_angle(self.value)
+
+    @property
+    def low(self):
+        """the low precision wire encoding"""
+        if self._low is None:
+            return self._cache('_low', self._encode(False))
+        return self._low
+
+    @property
+    def high(self):
+        """the high precision wire encoding"""
+        if self._high is None:
+            return self._cache('_high', self._encode(True))
+        return self._high
+
+    def encoding(self, high=False):
+        return self.high if high else self.low
+
+
+class Dec(Angle):
+    """Immutable declination in degrees, see Angle"""
+    __slots__ = ()
+
+
+class RA(Angle):
+    """Immutable right ascension in hours, from a float or an HH:MM.T or
+    HH:MM:SS string, see Angle"""
+    __slots__ = ()
+
+    @property
+    def degrees(self):
+        return self.value * 15.
+
+    def _encode(self, high):
+        return to_lx200_righta(self.degrees, high)
+
+
+def _need_numpy():
+    if np is None:
+        raise LX200Error("numpy is needed for array conversions")
+
+
+def separation(ra1, dec1, ra2, dec2):
+    """Angular distance in degrees between two RA/Dec positions in degrees"""
+    ra1, dec1, ra2, dec2 = [math.radians(a) for a in (ra1, dec1, ra2, dec2)]
+    # haversine form, well behaved for the small separations near a slew end
+    h = (math.sin((dec2 - dec1) / 2.) ** 2 +
+         math.cos(dec1) * math.cos(dec2) * math.sin((ra2 - ra1) / 2.) ** 2)
+    return math.degrees(2 * math.asin(min(1., math.sqrt(h))))
+
+
+def separation_array(ra1, dec1, ra2, dec2):
+    """separation for numpy arrays that broadcast"""
+    _need_numpy()
+    ra1, dec1, ra2, dec2 = [np.radians(a) for a in (ra1, dec1, ra2, dec2)]
+    h = (np.sin((dec2 - dec1) / 2.) ** 2 +
+         np.cos(dec1) * np.cos(dec2) * np.sin((ra2 - ra1) / 2.) ** 2)
+    return np.degrees(2 * np.arcsin(np.minimum(1., np.sqrt(h))))
+
+# -------------------------------------------------------------------------------
+# batch formatting: numpy arrays of floats to arrays of Sr/Sd payload strings,
+# rounded as the scalar to_lx200_* functions and built as code point columns
+# -------------------------------------------------------------------------------
+
+
+def _compose(n, columns):
+    """n strings from columns of code points: ints or arrays of n"""
+    cp = np.empty((n, len(columns)), dtype=np.uint32)
+    for j, c in enumerate(columns):
+        cp[:, j] = c
+    return cp.view('U%d' % len(columns)).reshape(n)
+
+
+def _two_digits(v):
+    return [48 + v // 10, 48 + v % 10]
+
+
+def to_lx200_righta_array(angles, high=False):
+    """to_lx200_righta for an array of angles in degrees"""
+    _need_numpy()
+    angles = np.asarray(angles, dtype=float).ravel()
+    if high:
+        secs = np.floor(angles % 360. * 240. + .5).astype(np.int64) % 86400
+        cols = (_two_digits(secs // 3600) + [ord(':')] +
+                _two_digits(secs // 60 % 60) + [ord(':')] +
+                _two_digits(secs % 60))
+    else:
+        tenths = np.floor(angles % 360. * 40. + .5).astype(np.int64) % 14400
+        cols = (_two_digits(tenths // 600) + [ord(':')] +
+                _two_digits(tenths // 10 % 60) + [ord('.'), 48 + tenths % 10])
+    return _compose(angles.size, cols)
+
+
+def to_lx200_angle_array(angles, high=False):
+    """to_lx200_angle, or to_lx200_long_angle if high, for an array of
+    angles in degrees (-99..99)"""
+    _need_numpy()
+    angles = np.asarray(angles, dtype=float).ravel()
+    units = 3600. if high else 60.
+    total = np.floor(np.abs(angles) * units + .5).astype(np.int64)
+    sign = np.where((angles < 0) & (total > 0), ord('-'), ord('+'))
+    if high:
+        cols = ([sign] + _two_digits(total // 3600) + [ord(DEG)] +
+                _two_digits(total // 60 % 60) + [ord(':')] +
+                _two_digits(total % 60))
+    else:
+        cols = ([sign] + _two_digits(total // 60) + [ord(DEG)] +
+                _two_digits(total % 60))
+    return _compose(angles.size, cols)
+
+# -------------------------------------------------------------------------------
+# sidereal time from the host clock, UTC as unix seconds. Longitude in
+# degrees, West positive as the scope reports it
+# -------------------------------------------------------------------------------
+
+
+def _gmst(days):
+    """Greenwich mean sidereal time in hours, days since J2000.0 UT"""
+    # whole days only add their 0.0657... hour excess over 24 hours, so the
+    # large multiples of 24 never reach the float sum
+    whole = days // 1.
+    return (18.697374558 + 24. * (days - whole) +
+            0.06570982441908 * whole +
+            0.06570982441908 * (days - whole)) % 24.
+
+
+def local_sidereal_time(long, utc=None):
+    """Local mean sidereal time in hours at utc (now if None)"""
+    if utc is None:
+        utc = time.time()
+    return (_gmst(utc / 86400. - 10957.5) - long / 15.) % 24.
+
+
+def local_sidereal_time_array(long, utc):
+    """local_sidereal_time for a numpy array of utc times"""
+    _need_numpy()
+    days = np.asarray(utc, dtype=float) / 86400. - 10957.5
+    return (_gmst(days) - np.asarray(long) / 15.) % 24.
+
+# -------------------------------------------------------------------------------
+# coordinate transforms on numpy arrays (or scalars) of any shape
+# angles are degrees, sidereal time is hours, azimuth runs from North through
+# East. Arguments broadcast: ra[:, None] with lst[None, :] gives every object
+# at every time
+# -------------------------------------------------------------------------------
+
+
+def hour_angle(ra, lst):
+    """Hour angle in degrees, -180..180, of RA (degrees) at lst (hours)"""
+    _need_numpy()
+    return (np.asarray(lst) * 15. - np.asarray(ra) + 180.) % 360. - 180.
+
+
+def ra_from_hour_angle(ha, lst):
+    """RA in degrees, 0..360, of hour angle ha (degrees) at lst (hours)"""
+    _need_numpy()
+    return (np.asarray(lst) * 15. - np.asarray(ha)) % 360.
+
+
+def equatorial_to_horizontal(ha, dec, lat):
+    """Hour angle/Dec to altitude/azimuth at latitude lat"""
+    _need_numpy()
+    ha, dec, lat = np.radians(ha), np.radians(dec), np.radians(lat)
+    sinAlt = np.sin(dec) * np.sin(lat) + np.cos(dec) * np.cos(lat) * np.cos(ha)
+    alt = np.arcsin(np.clip(sinAlt, -1., 1.))
+    az = np.arctan2(-np.cos(dec) * np.sin(ha),
+                    np.sin(dec) * np.cos(lat) -
+                    np.cos(dec) * np.sin(lat) * np.cos(ha))
+    return np.degrees(alt), np.degrees(az) % 360.
+
+
+def horizontal_to_equatorial(alt, az, lat):
+    """Altitude/azimuth to hour angle/Dec at latitude lat"""
+    _need_numpy()
+    alt, az, lat = np.radians(alt), np.radians(az), np.radians(lat)
+    sinDec = np.sin(alt) * np.sin(lat) + np.cos(alt) * np.cos(lat) * np.cos(az)
+    dec = np.arcsin(np.clip(sinDec, -1., 1.))
+    ha = np.arctan2(-np.cos(alt) * np.sin(az),
+                    np.sin(alt) * np.cos(lat) -
+                    np.cos(alt) * np.sin(lat) * np.cos(az))
+    return np.degrees(ha), np.degrees(dec)
+
+
+def radec_to_altaz(ra, dec, lst, lat):
+    """RA/Dec to altitude/azimuth at lst (hours) and latitude lat"""
+    return equatorial_to_horizontal(hour_angle(ra, lst), dec, lat)
+
+
+def altaz_to_radec(alt, az, lst, lat):
+    """Altitude/azimuth to RA/Dec at lst (hours) and latitude lat"""
+    ha, dec = horizontal_to_equatorial(alt, az, lat)
+    return ra_from_hour_angle(ha, lst), dec
+
+
+def parallactic_angle(ha, dec, lat):
+    """Parallactic angle in degrees, positive west of the meridian"""
+    _need_numpy()
+    ha, dec, lat = np.radians(ha), np.radians(dec), np.radians(lat)
+    return np.degrees(np.arctan2(np.sin(ha),
+                                 np.tan(lat) * np.cos(dec) -
+                                 np.sin(dec) * np.cos(ha)))
+
+
+def field_rotation_rate(alt, az, lat):
+    """Field rotation of an alt-az mount in degrees per hour, as the
+    field derotator has to follow it"""
+    _need_numpy()
+    alt, az, lat = np.radians(alt), np.radians(az), np.radians(lat)
+    return 15. * SIDEREAL_RATE * np.cos(lat) * np.cos(az) / np.cos(alt)
+
+
+def airmass(alt):
+    """Kasten & Young (1989) airmass of altitude alt, inf below the horizon"""
+    _need_numpy()
+    alt = np.asarray(alt, dtype=float)
+    h = np.maximum(alt, 0.)
+    x = 1. / (np.sin(np.radians(h)) + 0.50572 * (h + 6.07995) ** -1.6364)
+    return np.where(alt < 0., np.inf, x)
@@ -11,7 +11,121 @@
 # Licence:     LGPL
 #
 # -----------------------------------------------------------------------------
+import asyncio
+import calendar
+import re
+import threading
 import time
+from collections import deque, namedtuple
+from .LX200Error import LX200Error
+from .LXSerial import STRING
+
+# parsed NMEA sentences; lat North positive and long West positive degrees,
+# as the scope's site, time seconds of the UTC day, or unix seconds for RMC
+GGA = namedtuple('GGA', 'time lat long quality satellites hdop altitude')
+RMC = namedtuple('RMC', 'time valid lat long speed course')
+GSA = namedtuple('GSA', 'mode fix prns pdop hdop vdop')
+
+# $<talker><type>,<fields>*<checksum>, ended by '#', CR or LF
+NMEA_SENTENCE = re.compile(r'\$([^$*#\r\n]*)\*([0-9A-Fa-f]{2})')
+
+
+def _nmea_float(field):
+    return float(field) if field else None
+
+
+def _nmea_angle(field, hemi, negative):
+    """ dddmm.mmmm and N/S/E/W into signed degrees"""
+    if not field:
+        return None
+    dot = field.find('.')
+    head = dot - 2 if dot >= 0 else len(field) - 2
+    deg = float(field[:head]) + float(field[head:]) / 60.
+    return -deg if hemi == negative else deg
+
+
+def _nmea_seconds(field):
+    """ hhmmss.ss into seconds of the day"""
+    if not field:
+        return None
+    return int(field[:2]) * 3600 + int(field[2:4]) * 60 + float(field[4:])
+
+
+def parse_nmea(body):
+    """ A GGA, RMC or GSA record from the body of a sentence (between '$'
+    and '*'), None for other sentences"""
+    f = body.split(',')
+    kind = f[0][2:]
+    try:
+        if kind == 'GGA':
+            return GGA(_nmea_seconds(f[1]), _nmea_angle(f[2], f[3], 'S'),
+                       _nmea_angle(f[4], f[5], 'E'), int(f[6] or 0),
+                       int(f[7] or 0), _nmea_float(f[8]), _nmea_float(f[9]))
+        if kind == 'RMC':
+            t = None
+            if f[1] and f[9]:
+                year = int(f[9][4:6])
+                year += 1900 if year >= 80 else 2000
+                t = calendar.timegm((year, int(f[9][2:4]), int(f[9][:2]), 0,
+                                     0, 0)) + _nmea_seconds(f[1])
+            return RMC(t, f[2] == 'A', _nmea_angle(f[3], f[4], 'S'),
+                       _nmea_angle(f[5], f[6], 'E'), _nmea_float(f[7]),
+                       _nmea_float(f[8]))
+        if kind == 'GSA':
+            return GSA(f[1], int(f[2] or 1), [int(p) for p in f[3:15] if p],
+                       _nmea_float(f[15]), _nmea_float(f[16]),
+                       _nmea_float(f[17]))
+    except (IndexError, ValueError):
+        return None
+    return None
+
+
+class NMEAParser:
+    """Incremental NMEA parser: feed it whatever the port returned, take
+    the records of the complete sentences so far. Sentences are found in
+    place in the buffer, which is trimmed once per feed, and checksums
+    checked; the last records are kept in a ring buffer"""
+
+    def __init__(self, history=100):
+        """Constructor.
+        Arguments: history the number of recent records to keep
+        """
+        self.buffer = ''
+        self.history = deque(maxlen=history)
+        self.last = {}  # latest record by type
+        self.badChecksums = 0
+
+    def __repr__(self):
+        """Return a representation string.
+        """
+        return "<LX200 NMEA parser, %d records>" % len(self.history)
+
+    def feed(self, data):
+        """ Adds port data (str or bytes)
+        Returns: list of the records of the sentences it completed"""
+        if isinstance(data, bytes):
+            data = data.decode('ascii', 'replace')
+        self.buffer += data
+        records = []
+        end = 0
+        for match in NMEA_SENTENCE.finditer(self.buffer):
+            body = match.group(1)
+            check = 0
+            for c in body.encode('ascii', 'replace'):
+                check ^= c
+            end = match.end()
+            if check != int(match.group(2), 16):
+                self.badChecksums += 1
+                continue
+            record = parse_nmea(body)
+            if record is not None:
+                records.append(record)
+                self.history.append(record)
+                self.last[type(record).__name__] = record
+        # keep only what may be the start of an unfinished sentence
+        start = self.buffer.rfind('$', end)
+        self.buffer = self.buffer[start:] if start >= 0 else ''
+        return records
 
 
 class LXGPS:
@@ -24,12 +138,20 @@ class LXGPS:
         """Constructor.
         """
         self.comPort = comPort
+        self.slewModel = None  # a SlewModel to tell of slew rate changes
+        self.receiver = None  # an external GPSReceiver, see GPS
+        self.nmea = NMEAParser()  # recent GPS records, see GPS_stream
 
     def __repr__(self):
         """Return a representation string.
         """
         return "<LX200 GPS instance>"
 
+    @property
+    def model(self):
+        # the port's, kept right by Telescope.determine_model
+        return self.comPort.model
+
     # -------------------------------------------------------------------------------
     # B - Active Backlash Compensation
     # -------------------------------------------------------------------------------
@@ -59,14 +181,22 @@ class LXGPS:
     # -------------------------------------------------------------------------------
 
     def GPS(self, state="on", data=None):
+        """ Turns the GPS on or off: the LX200GPS's own, else an external
+        GPSReceiver, data or the one given before"""
         if self.model == 'LX200GPS':
             if state == "on":
                 self.GPS_on()
             else:
                 self.GPS_off()
         else:
-            # attempt to use a connected GPS
-            pass
+            # use a connected GPS
+            if data is not None:
+                self.receiver = data
+            if self.receiver is not None:
+                if state == "on":
+                    self.receiver.start()
+                else:
+                    self.receiver.stop()
         return
 
     def GPS_on(self):
@@ -86,6 +216,40 @@ class LXGPS:
         if self.model == 'LX200GPS':
             return self.comPort.CommandString("gps")
 
+    def _stream_read(self):
+        """ whatever the port has, waiting for at least a character"""
+        port = self.comPort.connectedPort
+        with self.comPort.lock:
+            return port.read(max(1, getattr(port, 'in_waiting', 0)))
+
+    def GPS_stream(self, cancel=None, start=True):
+        """ LX200GPS Only - Turns on the NMEA stream (start) and yields the
+        parsed GGA, RMC and GSA records as they arrive, until cancel (a
+        threading.Event) is set or the port times out. The records are
+        also kept in self.nmea.history and self.nmea.last"""
+        if start:
+            self.comPort.CommandBlind("gps")
+        cancel = cancel or threading.Event()
+        while not cancel.is_set():
+            data = self._stream_read()
+            if not data:
+                return
+            for record in self.nmea.feed(data):
+                yield record
+
+    async def GPS_stream_async(self, start=True):
+        """ asyncio version of GPS_stream, the port is read in an executor
+        thread; stop it by cancelling the task or leaving the async for"""
+        if start:
+            self.comPort.CommandBlind("gps")
+        loop = asyncio.get_running_loop()
+        while True:
+            data = await loop.run_in_executor(None, self._stream_read)
+            if not data:
+                return
+            for record in self.nmea.feed(data):
+                yield record
+
     def get_GPS_time(self):
         """ Powers up the GPS and updates the system time from the GPS stream.
         The process my take several minutes to complete.
@@ -95,8 +259,10 @@ class LXGPS:
         if self.model == 'LX200GPS':
             return self.comPort.CommandBool("gT")
         else:
-            # attempt to use a connected GPS
-            pass
+            # use a connected GPS, see GPSReceiver.sync; to the second, as
+            # good as gT, even before its sentence lag is calibrated
+            if self.receiver is not None:
+                return self.receiver.sync(coarse=True)
 
     def version_info(self):
         if self.model != 'LX200GPS':
@@ -104,16 +270,18 @@ class LXGPS:
                 "unsupported model: " +
                 self.model +
                 " for version")
-        return "%s (ver. %s -- %s %s)" % (self.get_product_name(),
-                                          self.get_firmware_num(),
-                                          self.get_firmware_date(),
-                                          self.get_firmware_time())
+        return "%s (ver. %s -- %s %s)" % tuple(self.version_info_list())
 
     def version_info_list(self):
-        return [self.get_product_name(),
-                self.get_firmware_num(),
-                self.get_firmware_date(),
-                self.get_firmware_time()]
+        """ Product name, firmware number, date and time, in one pipelined
+        exchange"""
+        if self.model != 'LX200GPS':
+            raise LX200Error(
+                "unsupported model: " +
+                self.model +
+                " for version")
+        return self.comPort.CommandPipeline([(STRING, "GVP"), (STRING, "GVN"),
+                                             (STRING, "GVD"), (STRING, "GVT")])
 
     def get_firmware_date(self):
         """ Get Telescope Firmware Date
@@ -223,11 +391,15 @@ class LXGPS:
         """Set RA/Azimuth Slew rate to DD.D degrees per second [LX200GPS Only]
         Returns: Nothing"""
         self.comPort.CommandBlind("RA", rate)
+        if self.slewModel is not None:
+            self.slewModel.set_rates(ra=rate)
 
     def set_DEC_slew_rate(self, rate):
         """Set Dec/Elevation Slew rate to DD.D degrees per second [ LX200GPS only]
         Returns: Nothing"""
         self.comPort.CommandBlind("RE", rate)
+        if self.slewModel is not None:
+            self.slewModel.set_rates(dec=rate)
 
     # -------------------------------------------------------------------------------
     # Appendix A: LX200GPS Command Extensions
@@ -287,10 +459,14 @@ class LXGPS:
     def set_RA_slew_rate(self, r):
         """ Programmable Slew Rates"""
         self.comPort.CommandBlind("RA", r)
+        if self.slewModel is not None:
+            self.slewModel.set_rates(ra=r)
 
     def set_DEC_slew_rate(self, r):
         """ Programmable Slew Rates"""
         self.comPort.CommandBlind("RE", r)
+        if self.slewModel is not None:
+            self.slewModel.set_rates(dec=r)
 
     def set_guide_rate(self, r):
         """ Programmable Guiding Rates"""
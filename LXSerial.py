@@ -14,8 +14,17 @@
 
 import serial
 import sys
+import threading
 from LX200.LX200Error import LX200Error
 
+# reply kinds for CommandPipeline
+BLIND = 0   # no reply
+BOOL = 1    # a single '0' or '1'
+STRING = 2  # a '#' terminated string
+STATUS = 3  # a digit, then a '#' terminated message unless it is '0'
+# two character command groups, see Telescope.COMMAND_GROUPS
+LONG_GROUPS = ('$B', '$Q')
+
 
 class LXSerial:
     def __init__(self, model='LX200', debug=False):
@@ -34,6 +43,12 @@ class LXSerial:
         self.model = model
         self.debug = debug
         self.connectedPort = None
+        # held for each whole exchange, so threads sharing the port do not
+        # interleave commands and replies
+        self.lock = threading.RLock()
+        # command group -> 'x', 'p' or '-' support, set by
+        # Telescope.determine_model; '-' groups are refused without a write
+        self.capabilities = None
         self.repr = "<LX200 serial port instance, unconnected>"
 
     def __repr__(self):
@@ -45,24 +60,37 @@ class LXSerial:
     # com port utility methods
     # -------------------------------------------------------------------------------
 
+    def frame(self, cmd, *args):
+        """packages up command letters and args in #: #, None args are skipped"""
+        return '#:%s%s#' % (cmd, ''.join([str(s) for s in args if s is not None]))
+
+    def check(self, cmd):
+        """raises LX200Error for a command the model does not support"""
+        if self.capabilities is None:
+            return
+        group = cmd[:2] if cmd[:2] in LONG_GROUPS else cmd[:1]
+        if self.capabilities.get(group) == '-':
+            raise LX200Error("unsupported model: %s for %s" % (self.model, cmd))
+
     def CommandBlind(self, cmd, *args):
         """simply packages up command letters in #: # and sends to telescope"""
-        arg = ''.join([str() for s in args])
-        if self.debug:
-            self.connectedPort.seek(0)
-        try:
-            self.connectedPort.write('#:%s%s#' % (cmd, str(arg)))
-        except IOError as xxx_todo_changeme:
-            (errno, strerror) = xxx_todo_changeme.args
-            print("I/O error(%s): %s" % (errno, strerror))
-        except ValueError:
-            print("bad arg value", arg)
-        except BaseException:
-            print("Unexpected error:", sys.exc_info()[0])
-            raise
-        else:
-            print("CommandBlind", cmd, args, "succeeded")
-            return True
+        self.check(cmd)
+        with self.lock:
+            if self.debug:
+                self.connectedPort.seek(0)
+            try:
+                self.connectedPort.write(self.frame(cmd, *args))
+            except IOError as xxx_todo_changeme:
+                (errno, strerror) = xxx_todo_changeme.args
+                print("I/O error(%s): %s" % (errno, strerror))
+            except ValueError:
+                print("bad arg value", args)
+            except BaseException:
+                print("Unexpected error:", sys.exc_info()[0])
+                raise
+            else:
+                print("CommandBlind", cmd, args, "succeeded")
+                return True
 
     def read_to_hash(self):
         """reads from port until hash encountered and returns """
@@ -78,23 +106,82 @@ class LXSerial:
 
         return resp[:-1]
 
+    def read_status(self):
+        """reads a digit status, and the '#' terminated message that follows
+        any status but '0'. returns the digit and message as one string"""
+        if self.debug:
+            return '0'
+        resp = self.connectedPort.read(1)
+        if resp and resp != '0':
+            resp += self.read_to_hash()
+        return resp
+
     def CommandString(self, cmd, *args):
         """issues a command to the telescope, and awaits a string response
         terminated by a '#'. returns string"""
-        self.CommandBlind(cmd, *args)
-        return self.read_to_hash()
+        with self.lock:
+            self.CommandBlind(cmd, *args)
+            return self.read_to_hash()
 
     def CommandBool(self, cmd, *args):
         """issues command and checks for '0' or '1' response. returns true
         on success. no hash returned in response."""
-        self.CommandBlind(cmd, *args)
-        if self.debug:
-            self.connectedPort.seek(0)
-        resp = self.connectedPort.read(1)
-        if resp == '1' or self.debug:
-            return True
-        else:
-            return False
+        with self.lock:
+            self.CommandBlind(cmd, *args)
+            if self.debug:
+                self.connectedPort.seek(0)
+            resp = self.connectedPort.read(1)
+            if resp == '1' or self.debug:
+                return True
+            else:
+                return False
+
+    def CommandChar(self, cmd, *args):
+        """issues command and returns its one character response, for
+        replies with no hash such as a digit status"""
+        with self.lock:
+            self.CommandBlind(cmd, *args)
+            if self.debug:
+                self.connectedPort.seek(0)
+            return self.connectedPort.read(1)
+
+    def CommandStatus(self, cmd, *args):
+        """issues a command to the telescope, and awaits a digit status and
+        the message that follows any status but '0'. returns both as one
+        string, see read_status"""
+        with self.lock:
+            self.CommandBlind(cmd, *args)
+            return self.read_status()
+
+    def CommandPipeline(self, cmds):
+        """issues several commands in a single port write, then reads their
+        replies in order, saving a round trip per command.
+        cmds is a list of (kind, cmd, arg...) tuples, kind one of BLIND, BOOL,
+        STRING or STATUS. returns the list of replies, None for BLIND commands"""
+        for c in cmds:
+            self.check(c[1])
+        with self.lock:
+            frames = ''.join([self.frame(*c[1:]) for c in cmds])
+            if self.debug:
+                self.connectedPort.seek(0)
+            try:
+                self.connectedPort.write(frames)
+            except BaseException:
+                raise LX200Error("port write error:  %s" % (sys.exc_info()[0]))
+            replies = []
+            for c in cmds:
+                if c[0] == BLIND:
+                    replies.append(None)
+                elif c[0] == STATUS:
+                    replies.append(self.read_status())
+                elif self.debug:
+                    # no scope, answer with the command chars
+                    replies.append(c[0] == BOOL or ''.join(map(str, c[1:])))
+                elif c[0] == BOOL:
+                    replies.append(self.connectedPort.read(1) == '1')
+                else:
+                    replies.append(self.read_to_hash())
+            return replies
 
     def connect(self, port, baud=9600, ptimeout=10):
         """Opens the port and checks for a telescope
@@ -131,14 +218,15 @@ class LXSerial:
 
         # Query of alignment mounting mode.
         # A If in AltAz Mode,L If in Land Mode,P If in Polar Mode
-        try:
-            self.connectedPort.write(chr(0x06))
-        except BaseException:
-            raise LX200Error("port write error:  %s" % (sys.exc_info()[0]))
-        if self.debug:
-            print("connectedPort:", self.connectedPort, "(debug)")
-            self.connectedPort.seek(0)
-        mode = self.connectedPort.read(1)
+        with self.lock:
+            try:
+                self.connectedPort.write(chr(0x06))
+            except BaseException:
+                raise LX200Error("port write error:  %s" % (sys.exc_info()[0]))
+            if self.debug:
+                print("connectedPort:", self.connectedPort, "(debug)")
+                self.connectedPort.seek(0)
+            mode = self.connectedPort.read(1)
         if self.debug:
             print('mode:', mode)
         if mode not in ['A', 'L', 'P', chr(0x06)]:
@@ -12,16 +12,48 @@
 #
 # -----------------------------------------------------------------------------
 
+from .LX200Error import LX200Error
+from .LX200Utils import to_float
+from .LXSerial import STRING
+
+# catalogs selected by set_library (Lo) and set_star_catalog (Ls), by number
+DEEP_SKY_LIBRARIES = ('NGC', 'IC', 'UGC', 'Caldwell', 'Arp', 'Abell')
+STAR_CATALOGS = ('STAR', 'SAO', 'GCVS', 'Hipparcos', 'HR', 'HD')
+# FIND/BROWSE constraint queries, see load_find_limits
+FIND_QUERIES = ('Gb', 'Gf', 'GF', 'Gq', 'Gl', 'Gs', 'Gy')
+# minimum quality settings in the order step_quality cycles through them
+QUALITIES = ('VP', 'PR', 'FR', 'GD', 'VG', 'EX', 'SU')
+
+
+def _catalog_number(num, names):
+    """ num as an int index of names
+    Raises LX200Error if it is not one"""
+    try:
+        n = int(num)
+    except (TypeError, ValueError):
+        n = -1
+    if not 0 <= n < len(names):
+        raise LX200Error("catalog number %r not in 0..%d" %
+                         (num, len(names) - 1))
+    return n
+
 
 class Library:
     """Class for the LX200 built-in object library     """
 
-    def __init__(self, comPort, debug=False):
+    def __init__(self, comPort, scope=None, debug=False):
         """Constructor.
 
-        Arguments: a COM port object instance from LXSerial to talk through
+        Arguments: a COM port object instance from LXSerial to talk through,
+        and the Telescope on it, whose site cache set_min_obj keeps current
         """
         self.comPort = comPort
+        self.scope = scope
+        self.catalog = None  # a local Catalog, see locate
+        self.deepSkyLibrary = DEEP_SKY_LIBRARIES[0]
+        self.starCatalog = STAR_CATALOGS[0]
+        self.selected = None  # (catalog, number) of the selected object
+        self.findLimits = None  # FIND_QUERIES replies, see load_find_limits
 
     def __repr__(self):
         """Return a representation string.
@@ -37,7 +69,7 @@ class Library:
         Returns: sMM.M#
         The magnitude of the brightest object to be returned from the telescope FIND/BROWSE command.
         Command when searching for objects in the Deep Sky database."""
-        self.comPort.CommandString("Gb")
+        return self._limit_value("Gb")
 
     def get_object_Dec(self):
         """ Get Currently Selected Object/Target Declination
@@ -51,14 +83,14 @@ class Library:
         Returns: NNN#
         An ASCIi interger expressing the diameter of the field search used
         in the IDENTIFY/FIND commands."""
-        self.comPort.CommandString("GF")
+        return self._limit_value("GF")
 
     def getMagFaintLimit(self):
         """ Get Browse Faint Magnitude Limit
         Returns: sMM.M")
         The magnitude or the faintest object to be returned from the telescope
         FIND/BROWSE command."""
-        self.comPort.CommandString("Gf")
+        return self._limit_value("Gf")
 
     def get_min_quality(self):
         """ Get Minimum Quality For Find Operation
@@ -71,14 +103,14 @@ class Library:
         PR# Poor
         VP# Very Poor
         The mimum quality of object returned by the FIND command."""
-        self.comPort.CommandString("Gq")
+        return self._limit_value("Gq")
 
     def get_smallest_limit(self):
         """ Get Larger Size Limit
         Returns: NNN'#
         The size of the smallest object to be returned by a search of the
         telescope using the BROWSE/FIND commands."""
-        self.comPort.CommandString("Gl")
+        return self._limit_value("Gl")
 
     def get_target_RA(self):
         """ Get current/target object RA
@@ -91,7 +123,7 @@ class Library:
         """ Get Smaller Size Limit
         Returns: NNN'#
         The size of the largest object returned by the FIND command expressed in arcminutes."""
-        return self.comPort.CommandString("Gs")
+        return self._limit_value("Gs")
 
     def get_search_string(self):
         """ Get deepsky object search string
@@ -104,7 +136,36 @@ class Library:
         D - Diffuse Nebulas
         C - Globular Clusters
         O - Open Clusters"""
-        return self.comPort.CommandString("Gy")
+        return self._limit_value("Gy")
+
+    def load_find_limits(self):
+        """ Reads the FIND/BROWSE magnitude limits, field diameter, quality,
+        size limits and search string in one pipelined exchange. The
+        getters above are then served from memory and the setters keep it
+        up to date.
+        Returns: dict of replies keyed by the FIND_QUERIES command"""
+        replies = self.comPort.CommandPipeline(
+            [(STRING, q) for q in FIND_QUERIES])
+        self.findLimits = dict(zip(FIND_QUERIES, replies))
+        return self.findLimits
+
+    def _limit_value(self, query):
+        if self.findLimits is None or self.findLimits[query] is None:
+            self.load_find_limits()
+        return self.findLimits[query]
+
+    def _limit_update(self, query, value):
+        if self.findLimits is not None:
+            self.findLimits[query] = value
+
+    def find_limits(self):
+        """ The field diameter, magnitude and size limits as numbers, in
+        the keywords of SkyIndex.within"""
+        return {'field': to_float(self._limit_value("GF")),
+                'bright': to_float(self._limit_value("Gb")),
+                'faint': to_float(self._limit_value("Gf")),
+                'smallest': to_float(self._limit_value("Gl").rstrip("'")),
+                'largest': to_float(self._limit_value("Gs").rstrip("'"))}
 
     # -------------------------------------------------------------------------------
     # L - Object Library Commands
@@ -121,6 +182,7 @@ class Library:
         Returns : Nothing
         LX200GPS & Autostar - Implemented in later firmware revisions"""
         self.comPort.CommandBlind("LC", "%4d" % (num))
+        self.selected = (self.deepSkyLibrary, num)
 
     def find_obj(self):
         """ Find Object using the current Size, Type, Upper limit, lower limt
@@ -142,13 +204,14 @@ class Library:
         Returns: <string>")
         Returns a string containing the current target object's name and object type.
         LX200GPS & Autostar - performs no operation. Returns static description of Andromeda Galaxy."""
-        self.comPort.CommandBlind("LI")
+        return self.comPort.CommandString("LI")
 
     def set_M_object(self, num):
         """Set current target object to Messier Object NNNN, an ASCII expressed decimal number.
         Returns: Nothing.
         LX200GPS and Autostar - Implemented in later versions."""
         self.comPort.CommandBlind("LM", "%4d" % (num))
+        self.selected = ('M', num)
 
     def find_next_obj(self):
         """ Find next deep sky target object subject to the current constraints.
@@ -167,7 +230,11 @@ class Library:
         1 Catalog available
         0 Catalog Not found
         LX200GPS & AutoStar - Performs no function always returns "1" """
-        return self.comPort.CommandBool("Lo", libNum)
+        libNum = _catalog_number(libNum, DEEP_SKY_LIBRARIES)
+        ok = self.comPort.CommandBool("Lo", libNum)
+        if ok:
+            self.deepSkyLibrary = DEEP_SKY_LIBRARIES[libNum]
+        return ok
 
     def set_star_catalog(self, num):
         """ Select star catalog D, an ASCII integer where D specifies:
@@ -180,13 +247,18 @@ class Library:
         Returns:
         1 Catalog Available
         2 Catalog Not Found"""
-        return self.comPort.CommandString("Ls", num)
+        num = _catalog_number(num, STAR_CATALOGS)
+        res = self.comPort.CommandString("Ls", num)
+        if res != '2':
+            self.starCatalog = STAR_CATALOGS[num]
+        return res
 
     def set_star_object(self, num):
         """Select star NNNN as the current target object from the currently selected catalog
         Returns: Nothing
         LX200GPS & AutoStar - Available in later firmwares"""
         self.comPort.CommandBlind("LS", "%4d" % (num))
+        self.selected = (self.starCatalog, num)
 
     # -------------------------------------------------------------------------------
     # S - Telescope Set Commands
@@ -196,27 +268,40 @@ class Library:
         Returns:
         0 - Valid
         1 - invalid number"""
-        return self.comPort.CommandBool("Sb", lim)
+        res = self.comPort.CommandBool("Sb", lim)
+        if not res:  # '0' is valid for this one
+            self._limit_update("Gb", "%+05.1f" % to_float(lim))
+        return res
 
     def set_faint_limit(self, lim):
         """Set faint magnitude limit to sMM.M
         Returns:
         0 - Invalid
         1 - Valid"""
-        return self.comPort.CommandBool("Sf", lim)
+        res = self.comPort.CommandBool("Sf", lim)
+        if res:
+            self._limit_update("Gf", "%+05.1f" % to_float(lim))
+        return res
 
     def set_field_dia(self, mins):
         """Set FIELD/IDENTIFY field diamter to NNNN arc minutes.
         Returns:
         0 - Invalid
         1 - Valid"""
-        return self.comPort.CommandBool("SF", mins)
+        res = self.comPort.CommandBool("SF", mins)
+        if res:
+            self._limit_update("GF", "%03d" % int(mins))
+        return res
 
     def set_min_obj(self, elev):
         """Set the minimum object elevation limit to DD")
+        Through the scope's set_min_elev when there is one, so its cached
+        limit, as used by Horizon and Planner, follows
             Returns:
         0 - Invalid
         1 - Valid"""
+        if self.scope is not None:
+            return self.scope.set_min_elev(elev)
         return self.comPort.CommandBool("Sh", elev)
 
     def set_smallest_size(self, size):
@@ -224,27 +309,44 @@ class Library:
         Returns:
         0 - Invalid
         1 - Valid"""
-        return self.comPort.CommandBool("Sl", size)
+        res = self.comPort.CommandBool("Sl", size)
+        if res:
+            self._limit_update("Gl", "%03d'" % int(size))
+        return res
 
     def step_quality(self):
         """Step the quality of limit used in FIND/BROWSE through its cycle of
         VP ... SU. Current setting can be queried with :Gq#
         Returns: Nothing"""
         self.comPort.CommandBlind("Sq")
+        quality = self.findLimits and self.findLimits["Gq"]
+        if quality in QUALITIES:
+            quality = QUALITIES[(QUALITIES.index(quality) + 1) % len(QUALITIES)]
+        else:
+            quality = None  # unknown, read it again when asked
+        self._limit_update("Gq", quality)
 
     def set_largest_size(self, size):
         """Set the size of the largest object the FIND/BROWSE command will return to NNNN arc minutes
         Returns:
         0 - Invalid
         1 - Valid"""
-        return self.comPort.CommandBool("Ss", size)
-
-    def set_obj_select(self):
-        """Sets the object selection string used by the FIND/BROWSE command.
+        res = self.comPort.CommandBool("Ss", size)
+        if res:
+            self._limit_update("Gs", "%03d'" % int(size))
+        return res
+
+    def set_obj_select(self, classes="GPDCO"):
+        """Sets the object selection string used by the FIND/BROWSE command,
+        upper case to include a class, lower case to ignore it, see
+        get_search_string.
         Returns:
         0 - Invalid
         1 - Valid"""
-        return self.comPort.CommandBool("SyGPDCO")
+        res = self.comPort.CommandBool("Sy", classes)
+        if res:
+            self._limit_update("Gy", classes)
+        return res
 
     # -------------------------------------------------------------------------------
     # C - Sync Control
@@ -256,3 +358,24 @@ class Library:
         LX200's - a "#" terminated string with the name of the object that was sync'd.
         Autostars & LX200GPS - A static string: " M31 EX GAL MAG 3.5 SZ178.0'#" """
         return self.comPort.CommandString("CM")
+
+    # -------------------------------------------------------------------------------
+    # local catalog
+    # -------------------------------------------------------------------------------
+
+    def locate(self, num, catalog='M'):
+        """ RA and Dec in degrees of catalog object num from the local
+        Catalog, without selecting it on the scope. catalog is 'M', a
+        DEEP_SKY_LIBRARIES or STAR_CATALOGS name
+        Raises LX200Error if there is no catalog or the object is not in it"""
+        if self.catalog is None:
+            raise LX200Error("no local catalog")
+        return self.catalog.position(catalog, num)
+
+    def selected_position(self):
+        """ RA and Dec in degrees of the object last selected with
+        set_M_object, set_target_object or set_star_object, from the local
+        Catalog instead of Gr/Gd"""
+        if self.selected is None:
+            raise LX200Error("no object selected")
+        return self.locate(self.selected[1], self.selected[0])
@@ -0,0 +1,231 @@
+#!/usr/bin/env python
+# -----------------------------------------------------------------------------
+# Name:        NameIndex.py
+# Purpose:     Name and designation search over a local LX200 Catalog
+#
+# Author(s):   R J Schumacher
+#
+# Created:     2026/10/19
+# RCS-ID:      $Id: NameIndex.py $
+# Copyright:   (c) 2026
+# Licence:     LGPL
+#
+# -----------------------------------------------------------------------------
+"""
+Turns what an operator types into the catalog and number the Library
+select commands expect:
+
+from LX200.NameIndex import NameIndex
+names = NameIndex(Catalog('objects'))
+names.resolve('Messier 31')     # ('M', 31)
+names.find('NGC224')            # [('M', 31), ('NGC', 224)]
+names.prefix('andro')           # objects whose names start so
+names.search('Andromda')        # exact, else prefix, else close names
+library.set_M_object(names.resolve('m 31')[1])
+
+Every object is known by its designation (M31, NGC224, HIP32349 ...) and
+by the designations and common names in its catalog name, comma separated,
+e.g. "Andromeda Galaxy, NGC 224". Objects sharing any of these are the same
+object, so M31 and NGC 224 are found by either. Keys are normalised: upper
+case letters and digits only, catalog prefixes spelt one way, no leading
+zeros. They are kept in one sorted array, so exact and prefix lookups are
+binary searches.
+
+Needs numpy.
+"""
+
+import bisect
+import difflib
+import re
+import unicodedata
+import numpy as np
+from .Catalog import CATALOGS
+from .Harvester import INFO_TYPES
+from .Library import QUALITIES
+
+# prefixes an operator may use for each catalog, the first the canonical one
+PREFIXES = {'M': ('M', 'MESSIER'), 'NGC': ('NGC',), 'IC': ('IC',),
+            'UGC': ('UGC',), 'Caldwell': ('C', 'CALDWELL', 'CALD'),
+            'Arp': ('ARP',), 'Abell': ('ABELL', 'ACO'), 'STAR': ('STAR',),
+            'SAO': ('SAO',), 'GCVS': ('GCVS',),
+            'Hipparcos': ('HIP', 'HIPPARCOS'), 'HR': ('HR',), 'HD': ('HD',)}
+CANONICAL = dict([(p, v[0]) for v in PREFIXES.values() for p in v])
+DESIGNATION = re.compile(r'^(%s)0*(\d+)$' % '|'.join(
+    sorted(CANONICAL, key=len, reverse=True)))
+# designations inside a name, "NGC 224", "M31"
+NAME_DESIGNATION = re.compile(r'\b(%s)\s*(\d+)\b' % '|'.join(
+    sorted(CANONICAL, key=len, reverse=True)), re.IGNORECASE)
+# handbox info string words that are not part of a name
+INFO_WORDS = set(INFO_TYPES) | set(QUALITIES)
+INFO_TAIL = re.compile(r'\bMAG\b.*$|\bSZ\s*[\d.].*$')
+
+
+def normalise(text):
+    """ Search key of a name or designation: "Messier 031" -> "M31",
+    "Barnard's Star" -> "BARNARDSSTAR" """
+    text = unicodedata.normalize('NFKD', str(text))
+    key = re.sub(r'[^A-Z0-9]', '', text.upper())
+    match = DESIGNATION.match(key)
+    if match:
+        return CANONICAL[match.group(1)] + str(int(match.group(2)))
+    return key
+
+
+def _name_words(name):
+    """ the words of each common name in a catalog name"""
+    for part in re.split(r'[,;/]', NAME_DESIGNATION.sub(' ', name)):
+        part = INFO_TAIL.sub('', part)
+        yield [w for w in part.split() if w.upper() not in INFO_WORDS]
+
+
+def name_keys(name):
+    """ Designation keys and common name keys in a catalog name"""
+    designations = [normalise(p + n) for p, n in NAME_DESIGNATION.findall(name)]
+    names = []
+    for words in _name_words(name):
+        key = normalise(' '.join(words))
+        if re.search('[A-Z]', key):
+            names.append(key)
+    return designations, names
+
+
+class NameIndex:
+    """Sorted key index over a Catalog's designations and names"""
+
+    def __init__(self, catalog):
+        """Constructor.
+        Arguments: a Catalog
+        """
+        self.catalog = catalog
+        n = len(catalog)
+        codes = np.asarray(catalog.catalog)
+        self.codes = codes
+        self.numbers = np.asarray(catalog.number)
+        prefixes = np.array([PREFIXES[c[0]][0] for c in CATALOGS])
+        keys = [np.char.add(prefixes[codes], self.numbers.astype(str))]
+        rows = [np.arange(n)]
+        extraKeys, extraRows, names = [], [], set()
+        # name word -> the common name keys it is in, for fuzzy
+        self.words = {}
+        offsets = np.asarray(catalog.offsets)
+        for row in np.nonzero(offsets[1:] > offsets[:-1])[0]:
+            name = catalog.name(row)
+            designations, common = name_keys(name)
+            extraKeys += designations + common
+            extraRows += [row] * (len(designations) + len(common))
+            names.update(common)
+            for words in _name_words(name):
+                key = normalise(' '.join(words))
+                for w in words:
+                    w = normalise(w)
+                    if len(w) > 2 and re.search('[A-Z]', w):
+                        self.words.setdefault(w, set()).add(key)
+        keys.append(np.array(extraKeys, dtype=str))
+        rows.append(np.array(extraRows, dtype=int))
+        keys = np.concatenate(keys).astype(bytes)
+        rows = np.concatenate(rows)
+        order = np.argsort(keys, kind='stable')
+        self.keys = keys[order]
+        self.rows = rows[order]
+        self.names = sorted(names)
+        self._group(n)
+
+    def __repr__(self):
+        """Return a representation string.
+        """
+        return "<LX200 NameIndex instance, %d keys>" % len(self.keys)
+
+    def _group(self, n):
+        """ links rows sharing a key into one object group"""
+        parent = np.arange(n)
+
+        def root(i):
+            while parent[i] != i:
+                parent[i] = parent[parent[i]]
+                i = parent[i]
+            return i
+        same = np.nonzero(self.keys[1:] == self.keys[:-1])[0]
+        for i in same:
+            a, b = root(self.rows[i]), root(self.rows[i + 1])
+            if a != b:
+                parent[max(a, b)] = min(a, b)
+        for i in np.unique(self.rows[same]):
+            parent[i] = root(i)
+        group = parent
+        self.groupRows = np.argsort(group, kind='stable')
+        self.groups = group[self.groupRows]
+        self.group = group
+
+    def _objects(self, rows):
+        """ (catalog, number) of every object in the groups of rows, in
+        CATALOGS order"""
+        groups = np.unique(self.group[rows])
+        start = np.searchsorted(self.groups, groups, 'left')
+        end = np.searchsorted(self.groups, groups, 'right')
+        found = np.concatenate([self.groupRows[s:e]
+                                for s, e in zip(start, end)] or [[]])
+        found = np.unique(found.astype(int))
+        found = found[np.lexsort((self.numbers[found], self.codes[found]))]
+        return [(CATALOGS[self.codes[r]][0], int(self.numbers[r]))
+                for r in found]
+
+    def _range(self, key, prefix=False):
+        key = key.encode('ascii')
+        lo = np.searchsorted(self.keys, key, 'left')
+        if prefix:
+            # every key starting with key sorts before key + 0xff
+            return lo, np.searchsorted(self.keys, key + b'\xff', 'left')
+        return lo, np.searchsorted(self.keys, key, 'right')
+
+    def find(self, text):
+        """ Objects known exactly as text
+        Returns: list of (catalog, number)"""
+        lo, hi = self._range(normalise(text))
+        return self._objects(self.rows[lo:hi])
+
+    def prefix(self, text, limit=20):
+        """ Objects with a designation or name starting with text, at most
+        limit of them
+        Returns: list of (catalog, number)"""
+        key = normalise(text)
+        if not key:
+            return []
+        lo, hi = self._range(key, prefix=True)
+        return self._objects(self.rows[lo:min(hi, lo + limit)])[:limit]
+
+    def fuzzy(self, text, n=5, cutoff=.75):
+        """ Objects with a common name, a word of one, or the start of one
+        as long as text that is close to text, for typing mistakes:
+        "Andromda" finds the Andromeda Galaxy
+        Returns: list of (catalog, number)"""
+        key = normalise(text)
+        if not key:
+            return []
+        choices = set(self.words)
+        choices.update([name[:len(key)] for name in self.names])
+        res = []
+        for match in difflib.get_close_matches(key, list(choices), n, cutoff):
+            # names with the word, then names starting with it
+            found = set(self.words.get(match, ()))
+            i = bisect.bisect_left(self.names, match)
+            while i < len(self.names) and self.names[i].startswith(match):
+                found.add(self.names[i])
+                i += 1
+            for name in sorted(found):
+                res += [o for o in self.find(name) if o not in res]
+        return res
+
+    def search(self, text):
+        """ find, else prefix, else fuzzy matches of text"""
+        return self.find(text) or self.prefix(text) or self.fuzzy(text)
+
+    def resolve(self, text, catalogs=None):
+        """ The best match for text as the (catalog, number) to select it
+        with: Messier first, then the deep sky libraries, then the star
+        catalogs (or the first of catalogs that has it), None if nothing
+        matches"""
+        found = self.search(text)
+        if catalogs is not None:
+            found = sorted([o for o in found if o[0] in catalogs],
+                           key=lambda o: list(catalogs).index(o[0]))
+        return found[0] if found else None
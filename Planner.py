@@ -0,0 +1,191 @@
+#!/usr/bin/env python
+# -----------------------------------------------------------------------------
+# Name:        Planner.py
+# Purpose:     Nightly visibility planning for LX200 telescopes
+#
+# Author(s):   R J Schumacher
+#
+# Created:     2026/10/19
+# RCS-ID:      $Id: Planner.py $
+# Copyright:   (c) 2026
+# Licence:     LGPL
+#
+# -----------------------------------------------------------------------------
+"""
+Rise, transit and set times, highest altitude, the dark observable window
+and Moon separation for a whole catalog in one go:
+
+from LX200.Planner import Planner
+planner = Planner(scope)                  # site and altitude limit
+night = planner.plan(ra, dec, (2026, 10, 19))  # arrays of degrees
+up = night[night['hours'] > 2]
+
+All times are unix seconds (UTC). Sun and Moon use low precision formulae
+(about 0.01 and 0.3 degrees), plenty for planning.
+
+Needs numpy.
+"""
+
+import calendar
+import numpy as np
+from .LX200Error import LX200Error
+from .LX200Utils import *
+
+RISE_ALT = -0.5667  # altitude of rising and setting, for refraction
+DAY = 86400. / SIDEREAL_RATE  # solar seconds in a sidereal day
+
+PLAN_FIELDS = [('rise', float), ('transit', float), ('set', float),
+               ('maxAlt', float), ('start', float), ('end', float),
+               ('hours', float), ('moonSep', float)]
+
+
+def _days(utc):
+    """days since J2000.0"""
+    return np.asarray(utc, dtype=float) / 86400. - 10957.5
+
+
+def sun_radec(utc):
+    """Sun RA/Dec in degrees at utc"""
+    n = _days(utc)
+    g = np.radians(357.528 + 0.9856003 * n)
+    lam = np.radians(280.460 + 0.9856474 * n +
+                     1.915 * np.sin(g) + 0.020 * np.sin(2 * g))
+    eps = np.radians(23.439 - 0.0000004 * n)
+    ra = np.degrees(np.arctan2(np.cos(eps) * np.sin(lam), np.cos(lam))) % 360.
+    return ra, np.degrees(np.arcsin(np.sin(eps) * np.sin(lam)))
+
+
+def moon_radec(utc):
+    """Moon geocentric RA/Dec in degrees at utc"""
+    t = _days(utc) / 36525.
+
+    def s(a, b):
+        return np.sin(np.radians(a + b * t))
+    lam = np.radians(218.32 + 481267.881 * t + 6.29 * s(135.0, 477198.87) -
+                     1.27 * s(259.3, -413335.36) + 0.66 * s(235.7, 890534.22) +
+                     0.21 * s(269.9, 954397.74) - 0.19 * s(357.5, 35999.05) -
+                     0.11 * s(186.5, 966404.03))
+    beta = np.radians(5.13 * s(93.3, 483202.02) + 0.28 * s(228.2, 960400.89) -
+                      0.28 * s(318.3, 6003.15) - 0.17 * s(217.6, -407332.21))
+    x = np.cos(beta) * np.cos(lam)
+    y = 0.9175 * np.cos(beta) * np.sin(lam) - 0.3978 * np.sin(beta)
+    z = 0.3978 * np.cos(beta) * np.sin(lam) + 0.9175 * np.sin(beta)
+    return np.degrees(np.arctan2(y, x)) % 360., np.degrees(np.arcsin(z))
+
+
+class Planner:
+    """Visibility of many objects over one night at one site"""
+
+    def __init__(self, scope=None, lat=None, long=None, minAlt=None,
+                 twilight=-12.):
+        """Constructor.
+        Arguments: a Telescope to take the site latitude, longitude and
+        minimum altitude (high limit) from, or lat/long in degrees (West
+        positive) and minAlt; twilight the Sun altitude that counts as dark
+        """
+        if scope is not None:
+            lat = to_float(scope.get_site_lat()) if lat is None else lat
+            long = to_float(scope.get_current_long()) if long is None else long
+            if minAlt is None:
+                minAlt = to_float(scope.get_high_limit())
+        if lat is None or long is None:
+            raise LX200Error("Planner needs a scope or lat and long")
+        self.lat = lat
+        self.long = long
+        self.minAlt = 0. if minAlt is None else minAlt
+        self.twilight = twilight
+
+    def __repr__(self):
+        """Return a representation string.
+        """
+        return "<LX200 Planner instance, lat %.2f long %.2f>" % (self.lat,
+                                                                self.long)
+
+    def night_start(self, date):
+        """ Local mean noon of date, (year, month, day) or a datetime.date,
+        as unix seconds"""
+        if not isinstance(date, tuple):
+            date = (date.year, date.month, date.day)
+        return calendar.timegm(tuple(date[:3]) + (12, 0, 0)) + \
+            self.long / 15. * 3600.
+
+    def times(self, t0, step=300., hours=24.):
+        """ Time grid from t0 every step seconds"""
+        return t0 + np.arange(0., hours * 3600. + step / 2., step)
+
+    def sun_altitude(self, utc):
+        sra, sdec = sun_radec(utc)
+        lst = local_sidereal_time_array(self.long, utc)
+        return radec_to_altaz(sra, sdec, lst, self.lat)[0]
+
+    def events(self, ra, dec, t0):
+        """ Next transit after t0 and the rise and set around it, and the
+        transit altitude, for arrays of RA/Dec in degrees. Rise and set are
+        nan for objects that never set or never rise.
+        Returns: rise, transit, set, maxAlt arrays"""
+        ra = np.asarray(ra, dtype=float)
+        dec = np.asarray(dec, dtype=float)
+        lst0 = local_sidereal_time(self.long, t0)
+        transit = t0 + (ra / 15. - lst0) % 24. / 24. * DAY
+        lat = np.radians(self.lat)
+        d = np.radians(dec)
+        cosH = ((np.sin(np.radians(RISE_ALT)) - np.sin(lat) * np.sin(d)) /
+                (np.cos(lat) * np.cos(d)))
+        with np.errstate(invalid='ignore'):
+            half = np.degrees(np.arccos(cosH)) / 360. * DAY
+        half[np.abs(cosH) > 1.] = np.nan
+        maxAlt = 90. - np.abs(self.lat - dec)
+        return transit - half, transit, transit + half, maxAlt
+
+    def windows(self, ra, dec, utc, chunk=4096):
+        """ First and last grid time each object is above minAlt while the
+        Sun is below twilight, and the hours it is, for arrays of RA/Dec
+        in degrees over the time grid utc. Worked in chunks of objects to
+        bound memory; cos(HA) comes from outer products, so the grid needs
+        no trig, and altitude is compared as its sine.
+        Returns: start, end, hours arrays (start/end nan if never)"""
+        ra = np.radians(np.asarray(ra, dtype=float))
+        dec = np.radians(np.asarray(dec, dtype=float))
+        utc = np.asarray(utc, dtype=float)
+        lst = np.radians(local_sidereal_time_array(self.long, utc) * 15.)
+        dark = self.sun_altitude(utc) <= self.twilight
+        cosL, sinL = np.cos(lst)[dark], np.sin(lst)[dark]
+        darkUtc = utc[dark]
+        step = utc[1] - utc[0] if len(utc) > 1 else 0.
+        lat = np.radians(self.lat)
+        sinMin = np.sin(np.radians(self.minAlt))
+        n = len(ra)
+        start = np.full(n, np.nan)
+        end = np.full(n, np.nan)
+        hours = np.zeros(n)
+        if not len(darkUtc):
+            return start, end, hours
+        for i in range(0, n, chunk):
+            r, d = ra[i:i + chunk], dec[i:i + chunk]
+            a = np.sin(d) * np.sin(lat)
+            b = np.cos(d) * np.cos(lat)
+            # cos(lst - ra) = cos lst cos ra + sin lst sin ra
+            sinAlt = a[:, None] + b[:, None] * (np.outer(np.cos(r), cosL) +
+                                                np.outer(np.sin(r), sinL))
+            up = sinAlt >= sinMin
+            anyUp = up.any(axis=1)
+            first = up.argmax(axis=1)
+            last = up.shape[1] - 1 - up[:, ::-1].argmax(axis=1)
+            start[i:i + chunk] = np.where(anyUp, darkUtc[first], np.nan)
+            end[i:i + chunk] = np.where(anyUp, darkUtc[last], np.nan)
+            hours[i:i + chunk] = up.sum(axis=1) * step / 3600.
+        return start, end, hours
+
+    def plan(self, ra, dec, date, step=300.):
+        """ Visibility of arrays of RA/Dec in degrees on the night starting
+        on date (see night_start), with the Moon separation at midnight.
+        Returns: a numpy record array with PLAN_FIELDS per object"""
+        t0 = self.night_start(date)
+        res = np.zeros(len(ra), dtype=PLAN_FIELDS)
+        res['rise'], res['transit'], res['set'], res['maxAlt'] = \
+            self.events(ra, dec, t0)
+        res['start'], res['end'], res['hours'] = \
+            self.windows(ra, dec, self.times(t0, step))
+        mra, mdec = moon_radec(t0 + 43200.)
+        res['moonSep'] = separation_array(ra, dec, mra, mdec)
+        return res.view(np.recarray)
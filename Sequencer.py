@@ -0,0 +1,225 @@
+#!/usr/bin/env python
+# -----------------------------------------------------------------------------
+# Name:        Sequencer.py
+# Purpose:     Observation queue for LX200 telescopes
+#
+# Author(s):   R J Schumacher
+#
+# Created:     2026/10/19
+# RCS-ID:      $Id: Sequencer.py $
+# Copyright:   (c) 2026
+# Licence:     LGPL
+#
+# -----------------------------------------------------------------------------
+"""
+Orders a night's targets for the least slewing, then runs them:
+
+from LX200.Sequencer import Sequencer
+seq = Sequencer(scope, library)
+seq.add(5.59, -5.39, name='M42', end=time.time() + 3600, duration=600)
+seq.add_object(31)             # Messier, coordinates read from the scope
+seq.add_object(1976, 'NGC')    # selects the NGC library first
+for target, result in seq.run():
+    if result is not None and result.ok:
+        expose(target)
+
+Needs numpy.
+"""
+
+import time
+import numpy as np
+from .LX200Error import LX200Error
+from .LX200Utils import *
+from .LXSerial import STRING
+from .Library import DEEP_SKY_LIBRARIES, STAR_CATALOGS
+
+# catalogs add_object selects from
+CATALOG_SELECT = ('M',) + DEEP_SKY_LIBRARIES + STAR_CATALOGS
+LATE = 1e6  # objective weight of a second past a target's window
+
+
+class Target(object):
+    """One queue entry: RA and Dec, an optional name, the unix time window
+    [start, end] it must be observed in and the seconds it takes"""
+    __slots__ = ('ra', 'dec', 'name', 'start', 'end', 'duration')
+
+    def __init__(self, ra, dec, name=None, start=None, end=None, duration=0.):
+        self.ra = RA(ra)
+        self.dec = Dec(dec)
+        self.name = name
+        self.start = start
+        self.end = end
+        self.duration = duration
+
+    def __repr__(self):
+        return "<Target %s %s %s>" % (self.name, self.ra.high, self.dec.high)
+
+
+class Sequencer:
+    """Observation queue over a Telescope and, for catalog objects, its
+    Library. plan() orders the targets by nearest neighbour then 2-opt on
+    predicted slew time, run() works through them with pipelined gotos"""
+
+    def __init__(self, scope, library=None, rates=(8., 8.), settle=2.):
+        """Constructor.
+        Arguments: a Telescope instance, a Library for add_object,
+        rates the RA and Dec axis slew rates in degrees per second and
+        settle the seconds every slew takes on top of moving
+        """
+        self.scope = scope
+        self.library = library
+        self.rates = rates
+        self.settle = settle
+        self.targets = []
+        self.order = None
+
+    def __repr__(self):
+        """Return a representation string.
+        """
+        return "<LX200 Sequencer instance, %d targets>" % len(self.targets)
+
+    def add(self, ra, dec, name=None, start=None, end=None, duration=0.):
+        """ Queues a target, RA in hours and Dec in degrees (floats,
+        strings or RA/Dec), see Target
+        Returns: the Target"""
+        target = Target(ra, dec, name, start, end, duration)
+        self.targets.append(target)
+        self.order = None
+        return target
+
+    def add_object(self, num, catalog='M', **kw):
+        """ Queues a library object, selecting its library or star catalog
+        and then it through the Library, so its tracking stays right, and
+        reading its coordinates. catalog is 'M' or a DEEP_SKY_LIBRARIES or
+        STAR_CATALOGS name; keywords as for add
+        Returns: the Target
+        Raises LX200Error if there is no Library or the catalog is not
+        available"""
+        library = self.library
+        if library is None:
+            raise LX200Error("add_object needs a Library")
+        if catalog not in CATALOG_SELECT:
+            raise LX200Error("catalog not in %s" % list(CATALOG_SELECT))
+        with library.comPort.lock:
+            if catalog == 'M':
+                library.set_M_object(num)
+            elif catalog in DEEP_SKY_LIBRARIES:
+                if not library.set_library(DEEP_SKY_LIBRARIES.index(catalog)):
+                    raise LX200Error("library not available: " + catalog)
+                library.set_target_object(num)
+            else:
+                if library.set_star_catalog(
+                        STAR_CATALOGS.index(catalog)) == '2':
+                    raise LX200Error("catalog not available: " + catalog)
+                library.set_star_object(num)
+            ra, dec = library.comPort.CommandPipeline([(STRING, "Gr"),
+                                                       (STRING, "Gd")])
+        kw.setdefault('name', "%s%d" % (catalog, num))
+        return self.add(ra, dec, **kw)
+
+    # -------------------------------------------------------------------------------
+    # planning
+    # -------------------------------------------------------------------------------
+
+    def slew_times(self, ra1, dec1, ra2, dec2):
+        """ Predicted seconds to slew between RA/Dec positions in degrees,
+        numpy arrays that broadcast: from the scope's SlewModel if it has
+        one, else both axes move at once at rates, the slower one deciding"""
+        if self.scope.slewModel is not None:
+            return self.scope.slewModel.predict(ra1, dec1, ra2, dec2)
+        dRA = np.abs((np.asarray(ra2) - ra1 + 180.) % 360. - 180.)
+        dDec = np.abs(np.asarray(dec2) - dec1)
+        return np.maximum(dRA / self.rates[0], dDec / self.rates[1]) + \
+            self.settle
+
+    def _elapsed(self, route, costs, start, end, duration, t0):
+        """ seconds from t0 to the end of the route, waiting for windows
+        to open, plus LATE for every second spent past a window"""
+        t = t0
+        late = 0.
+        prev = 0
+        for j in route:
+            t = max(t + costs[prev, j], start[j])
+            t += duration[j]
+            late += max(0., t - end[j])
+            prev = j
+        return t - t0 + LATE * late
+
+    def plan(self, t0=None, position=None):
+        """ Orders the queue to finish soonest from time t0 (now if None)
+        and position (RA, Dec) in degrees (read from the scope if None).
+        Returns: the ordered Targets, also kept in self.order"""
+        if t0 is None:
+            t0 = time.time()
+        if position is None:
+            position = [to_float(r) for r in self.scope.comPort.CommandPipeline(
+                [(STRING, "GR"), (STRING, "GD")])]
+            position[0] *= 15.
+        n = len(self.targets)
+        # index 0 is the starting position, targets are 1..n
+        ra = np.array([position[0]] + [t.ra.degrees for t in self.targets])
+        dec = np.array([position[1]] + [t.dec.value for t in self.targets])
+        costs = self.slew_times(ra[:, None], dec[:, None], ra[None, :],
+                                dec[None, :])
+        start = np.array([-np.inf] + [-np.inf if t.start is None else t.start
+                                      for t in self.targets])
+        end = np.array([np.inf] + [np.inf if t.end is None else t.end
+                                   for t in self.targets])
+        duration = np.array([0.] + [t.duration for t in self.targets])
+
+        # nearest neighbour, by when each next target could be finished
+        route = []
+        left = list(range(1, n + 1))
+        t = t0
+        prev = 0
+        while left:
+            done = np.maximum(t + costs[prev, left], start[left]) + \
+                duration[left]
+            k = int(np.argmin(done + LATE * np.maximum(0., done - end[left])))
+            prev = left.pop(k)
+            route.append(prev)
+            t = done[k]
+
+        # 2-opt: reverse any stretch of the route that ends it sooner
+        best = self._elapsed(route, costs, start, end, duration, t0)
+        improved = True
+        while improved:
+            improved = False
+            for i in range(n - 1):
+                for j in range(i + 2, n + 1):
+                    trial = route[:i] + route[i:j][::-1] + route[j:]
+                    elapsed = self._elapsed(trial, costs, start, end,
+                                            duration, t0)
+                    if elapsed < best - 1e-9:
+                        route, best, improved = trial, elapsed, True
+        self.order = [self.targets[j - 1] for j in route]
+        return self.order
+
+    # -------------------------------------------------------------------------------
+    # running
+    # -------------------------------------------------------------------------------
+
+    def run(self, timeout=None, cancel=None):
+        """ Slews to each target in planned order (planning first if
+        needed), waiting for windows that have not opened yet.
+        - timeout: seconds allowed for each slew
+        - cancel: a threading.Event that stops the queue, halting any slew
+        Yields: (Target, GotoResult) once each slew is over, or
+        (Target, None) for a target whose window has closed"""
+        if self.order is None:
+            self.plan()
+        for target in self.order:
+            if cancel is not None and cancel.is_set():
+                return
+            now = time.time()
+            if target.end is not None and now + target.duration > target.end:
+                yield target, None
+                continue
+            if target.start is not None and now < target.start:
+                if cancel is None:
+                    time.sleep(target.start - now)
+                elif cancel.wait(target.start - now):
+                    return
+            result = self.scope.goto(target.ra, target.dec, wait=True,
+                                     timeout=timeout, cancel=cancel)
+            yield target, result
@@ -0,0 +1,166 @@
+#!/usr/bin/env python
+# -----------------------------------------------------------------------------
+# Name:        SkyIndex.py
+# Purpose:     Spatial index for local identify / nearest object queries
+#
+# Author(s):   R J Schumacher
+#
+# Created:     2026/10/19
+# RCS-ID:      $Id: SkyIndex.py $
+# Copyright:   (c) 2026
+# Licence:     LGPL
+#
+# -----------------------------------------------------------------------------
+"""
+Answers the handbox IDENTIFY and FIND questions from a local Catalog,
+without tying up the port:
+
+from LX200.SkyIndex import SkyIndex
+index = SkyIndex(Catalog('objects'))
+rows, seps = index.within(83.8, -5.4, field=60, faint=9.)  # FIND/BROWSE limits
+rows, seps = index.nearest(83.8, -5.4, 5)
+rows, seps = index.within(83.8, -5.4, **library.find_limits())  # scope's own
+print(index.catalog.row(rows[0]))
+
+Objects are binned on a cubic grid over their unit vectors, sorted by bin,
+so a query reads the few bins around it and tests only those objects. The
+limits are those of the FIND/BROWSE commands: field diameter in arc
+minutes, bright/faint magnitude limits and smallest/largest size in arc
+minutes. Objects with no magnitude or size pass those limits.
+
+Needs numpy.
+"""
+
+import numpy as np
+from .LX200Error import LX200Error
+
+PER_CELL = 16  # objects per occupied grid cell aimed for
+
+
+def unit_vectors(ra, dec):
+    """ (n, 3) unit vectors of RA/Dec arrays in degrees"""
+    ra = np.radians(np.asarray(ra, dtype=float))
+    dec = np.radians(np.asarray(dec, dtype=float))
+    cosDec = np.cos(dec)
+    return np.stack([cosDec * np.cos(ra), cosDec * np.sin(ra), np.sin(dec)],
+                    axis=-1)
+
+
+class SkyIndex:
+    """Grid index over a catalog's positions, with FIND/BROWSE filters"""
+
+    def __init__(self, catalog, cells=None):
+        """Constructor.
+        Arguments: a Catalog, or anything with ra and dec arrays in degrees
+        and optionally mag and size (arc minutes); cells the grid cells per
+        axis, by default chosen from the number of objects
+        Rows returned by queries are rows of catalog.
+        """
+        self.catalog = catalog
+        xyz = unit_vectors(catalog.ra, catalog.dec)
+        n = len(xyz)
+        if cells is None:
+            # about 4 pi / (cell side)^2 cells are occupied on the sphere
+            cells = int(np.clip(np.sqrt(n * np.pi / PER_CELL) / 2., 1, 256))
+        self.cells = cells
+        ids = self._cell_ids(xyz)
+        self.order = np.argsort(ids, kind='stable')
+        self.ids = ids[self.order]
+        self.xyz = xyz[self.order]
+        self.mag = self._column(catalog, 'mag')
+        self.size = self._column(catalog, 'size')
+
+    def __repr__(self):
+        """Return a representation string.
+        """
+        return "<LX200 SkyIndex instance, %d objects, %d cells per axis>" % (
+            len(self.order), self.cells)
+
+    def _column(self, catalog, name):
+        col = getattr(catalog, name, None)
+        if col is None:
+            return None
+        return np.asarray(col, dtype=float)[self.order]
+
+    def _cell(self, x):
+        return np.clip(((x + 1.) * (self.cells / 2.)).astype(np.int64), 0,
+                       self.cells - 1)
+
+    def _cell_ids(self, xyz):
+        c = self._cell(xyz)
+        return (c[..., 0] * self.cells + c[..., 1]) * self.cells + c[..., 2]
+
+    def _candidates(self, p, chord):
+        """ sorted positions of objects in the cells a ball of radius chord
+        about p touches"""
+        lo = self._cell(p - chord)
+        hi = self._cell(p + chord)
+        if np.prod(hi - lo + 1) > len(self.ids) // PER_CELL:
+            return np.arange(len(self.ids))  # most of the sky, test them all
+        x, y, z = [np.arange(lo[k], hi[k] + 1) for k in range(3)]
+        ids = ((x[:, None, None] * self.cells + y[None, :, None]) *
+               self.cells + z[None, None, :]).ravel()
+        start = np.searchsorted(self.ids, ids, 'left')
+        lens = np.searchsorted(self.ids, ids, 'right') - start
+        keep = lens > 0
+        start, lens = start[keep], lens[keep]
+        offsets = np.cumsum(lens) - lens
+        return (np.arange(lens.sum()) - np.repeat(offsets, lens) +
+                np.repeat(start, lens))
+
+    def select(self, pos, bright=None, faint=None, smallest=None,
+               largest=None):
+        """ Mask over sorted positions pos of the objects passing the
+        FIND/BROWSE magnitude and size limits"""
+        keep = np.ones(len(pos), dtype=bool)
+        if bright is not None or faint is not None:
+            if self.mag is None:
+                raise LX200Error("catalog has no magnitudes")
+            mag = self.mag[pos]
+            if bright is not None:
+                keep &= ~(mag < bright)
+            if faint is not None:
+                keep &= ~(mag > faint)
+        if smallest is not None or largest is not None:
+            if self.size is None:
+                raise LX200Error("catalog has no sizes")
+            size = self.size[pos]
+            if smallest is not None:
+                keep &= ~(size < smallest)
+            if largest is not None:
+                keep &= ~(size > largest)
+        return keep
+
+    def _within(self, p, radius, limits):
+        chord = 2. * np.sin(np.radians(min(radius, 180.)) / 2.)
+        pos = self._candidates(p, chord)
+        d = np.sqrt(((self.xyz[pos] - p) ** 2).sum(axis=1))
+        keep = (d <= chord) & self.select(pos, **limits)
+        pos, d = pos[keep], d[keep]
+        sort = np.argsort(d, kind='stable')
+        seps = np.degrees(2. * np.arcsin(np.minimum(d[sort] / 2., 1.)))
+        return self.order[pos[sort]], seps
+
+    def within(self, ra, dec, radius=None, field=None, **limits):
+        """ Objects within radius degrees, or the field diameter in arc
+        minutes, of RA/Dec in degrees that pass the limits (bright, faint,
+        smallest, largest)
+        Returns: catalog rows and separations in degrees, nearest first"""
+        if radius is None:
+            if field is None:
+                raise LX200Error("within needs a radius or field")
+            radius = field / 120.
+        return self._within(unit_vectors(ra, dec), radius, limits)
+
+    def nearest(self, ra, dec, n=1, **limits):
+        """ The n objects nearest RA/Dec in degrees that pass the limits
+        (bright, faint, smallest, largest), searching ever wider cones
+        Returns: catalog rows and separations in degrees, nearest first"""
+        p = unit_vectors(ra, dec)
+        # a cone expected to hold n objects, if they were spread evenly
+        radius = np.degrees(2. * np.sqrt(n / max(len(self.order), 1.)))
+        while True:
+            rows, seps = self._within(p, radius, limits)
+            if len(rows) >= n or radius >= 180.:
+                return rows[:n], seps[:n]
+            radius *= 2.
@@ -0,0 +1,120 @@
+#!/usr/bin/env python
+# -----------------------------------------------------------------------------
+# Name:        SlewModel.py
+# Purpose:     Slew duration prediction for LX200 telescopes
+#
+# Author(s):   R J Schumacher
+#
+# Created:     2026/10/19
+# RCS-ID:      $Id: SlewModel.py $
+# Copyright:   (c) 2026
+# Licence:     LGPL
+#
+# -----------------------------------------------------------------------------
+"""
+Predicts how long a goto takes, and learns the mount from the slews it sees:
+
+from LX200.SlewModel import SlewModel
+scope.slewModel = gps.slewModel = SlewModel()
+scope.goto(ra, dec, wait=True)  # recorded, sleeps through most of the slew
+
+Each axis accelerates at a constant rate up to its slew rate, cruises, and
+decelerates (a trapezoid, or a triangle for short moves). Both axes move at
+once, the slower one decides, and a settle time is added. The rates are
+the configured ones (set_slew_rate, set_RA_slew_rate, set_DEC_slew_rate)
+scaled by a learnt efficiency; acceleration and settle time are learnt.
+
+Needs numpy.
+"""
+
+import numpy as np
+
+
+class SlewModel:
+    """Slew duration model: configured axis rates, and learnt efficiency,
+    acceleration and settle time"""
+
+    def __init__(self, rates=(8., 8.), accel=4., settle=2., efficiency=1.,
+                 minSlews=5):
+        """Constructor.
+        Arguments: rates the RA and Dec axis slew rates in degrees per
+        second, accel in degrees per second per second, settle in seconds,
+        efficiency the fraction of the configured rate reached, minSlews
+        the recorded slews needed before fitting
+        """
+        self.rates = list(rates)
+        self.accel = accel
+        self.settle = settle
+        self.efficiency = efficiency
+        self.minSlews = minSlews
+        self.slews = []  # (RA degrees, Dec degrees, seconds)
+
+    def __repr__(self):
+        """Return a representation string.
+        """
+        return ("<LX200 SlewModel rates %s x %.2f, accel %.2f, settle %.1f>" %
+                (self.rates, self.efficiency, self.accel, self.settle))
+
+    def set_rates(self, ra=None, dec=None):
+        """ Records new axis slew rates in degrees per second, None leaves
+        an axis as it is"""
+        if ra is not None:
+            self.rates[0] = float(ra)
+        if dec is not None:
+            self.rates[1] = float(dec)
+
+    def _axis_time(self, d, v, a):
+        d = np.abs(d)
+        ramp = v * v / a  # distance spent speeding up and slowing down
+        return np.where(d >= ramp, d / v + v / a, 2. * np.sqrt(d / a))
+
+    def _predict(self, dRA, dDec, efficiency, accel, settle):
+        return np.maximum(
+            self._axis_time(dRA, self.rates[0] * efficiency, accel),
+            self._axis_time(dDec, self.rates[1] * efficiency, accel)) + settle
+
+    def predict(self, ra1, dec1, ra2, dec2):
+        """ Predicted seconds for slews between RA/Dec positions in degrees,
+        numpy arrays that broadcast"""
+        dRA = (np.asarray(ra2) - ra1 + 180.) % 360. - 180.
+        dDec = np.asarray(dec2) - dec1
+        return self._predict(dRA, dDec, self.efficiency, self.accel,
+                             self.settle)
+
+    def record(self, ra1, dec1, ra2, dec2, seconds):
+        """ Adds an observed slew, refitting once there are minSlews"""
+        self.slews.append(((ra2 - ra1 + 180.) % 360. - 180., dec2 - dec1,
+                           seconds))
+        if len(self.slews) >= self.minSlews:
+            self.fit()
+
+    def fit(self, iterations=20):
+        """ Least squares fit of efficiency, acceleration and settle time
+        to the recorded slews (damped Gauss-Newton on their logs, which
+        keeps them positive)
+        Returns: rms residual in seconds"""
+        dRA, dDec, seconds = np.array(self.slews, dtype=float).T
+        p = np.log([self.efficiency, self.accel, max(self.settle, .01)])
+
+        def residual(p):
+            return self._predict(dRA, dDec, *np.exp(p)) - seconds
+
+        r = residual(p)
+        damping = 1e-3
+        for i in range(iterations):
+            jac = np.empty((len(r), 3))
+            for k in range(3):
+                step = np.zeros(3)
+                step[k] = 1e-6
+                jac[:, k] = (residual(p + step) - r) / 1e-6
+            jtj = jac.T.dot(jac)
+            delta = np.linalg.solve(jtj + damping * np.diag(np.diag(jtj) + 1e-12),
+                                    -jac.T.dot(r))
+            trial = residual(p + delta)
+            if trial.dot(trial) < r.dot(r):
+                p, r = p + delta, trial
+                damping /= 10.
+            else:
+                damping *= 10.
+        self.efficiency, self.accel, self.settle = np.exp(p)
+        return float(np.sqrt(r.dot(r) / len(r)))
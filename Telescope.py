@@ -12,10 +12,16 @@
 #
 # -----------------------------------------------------------------------------
 
+import asyncio
+import configparser
+import re
+import sys
 import time
+from collections import namedtuple
 import LX200
 from .LX200Utils import *
 # from LX200.LXSerial import LXSerial
+from .LXSerial import BOOL, STATUS, STRING
 from LX200.LX200Error import LX200Error
 
 DEG = chr(223)  # ASCII char for degree
@@ -23,7 +29,52 @@ GUIDE = "G"
 CENTRE = "C"
 FIND = "M"
 MAX = "S"
+# R command rates by name, slowest to fastest
+SLEW_RATES = {'GUIDE': GUIDE, 'CENTRE': CENTRE, 'FIND': FIND, 'MAX': MAX}
 SUPPORTED_MODELS = ('AutoStar', 'LX200', 'LX16', 'LX200GPS')
+# command group support by model, in SUPPORTED_MODELS order, from the
+# protocol's command groupings table: x yes, p partly, - no
+COMMAND_GROUPS = {'A': 'xxxx', '$B': '---x', 'B': 'xppx', 'C': 'pppx',
+                  'D': 'xxxx', 'f': '--px', 'F': 'pppx', 'g': '---x',
+                  'G': 'xxxx', 'h': 'x-xx', 'H': 'xxxx', 'I': '---x',
+                  'L': 'pppx', 'M': 'xpxx', 'P': 'xxxx', '$Q': 'xxxx',
+                  'Q': 'xxxx', 'r': '--px', 'R': 'pppx', 'S': 'xxxx',
+                  'T': 'pppx', 'U': 'pxxx', 'W': 'xxxx', '?': '-xx-'}
+# GVP product names, by the model they belong to
+PRODUCT_MODELS = (('LX2001', 'LX200GPS'), ('LX200GPS', 'LX200GPS'),
+                  ('RCX', 'LX200GPS'), ('AUTOSTAR', 'AutoStar'))
+# a GA reply, sDD*MM or sDD*MM'SS, ending the determine_model probe
+ALTITUDE = re.compile(r'^[+-]\d\d.\d\d')
+# determine_model results by device: (model, product, firmware)
+DEVICE_MODELS = {}
+# state kept by save_session, restored by load_session: only what costs a
+# reply to set up, blind setup commands (W, A, R) are always sent
+SESSION = 'session.cfg'
+SESSION_STATE = ('displayPrecision', 'pointingMode')
+# site names 1-4, then the current site's latitude, longitude, UTC offset
+# and high/lower slew limits
+SITE_QUERIES = ('GM', 'GN', 'GO', 'GP', 'Gt', 'Gg', 'GG', 'Gh', 'Go')
+# MS slew status
+GOTO_OK = 0
+GOTO_BELOW_HORIZON = 1
+GOTO_ABOVE_LIMIT = 2
+
+
+class GotoResult(namedtuple('GotoResult', 'status message')):
+    """Parsed reply of a slew to target: status is one of GOTO_OK,
+    GOTO_BELOW_HORIZON or GOTO_ABOVE_LIMIT, message the scope's text"""
+    __slots__ = ()
+
+    @property
+    def ok(self):
+        return self.status == GOTO_OK
+
+    @classmethod
+    def parse(cls, resp):
+        """from a '0', '1<string>' or '2<string>' MS reply"""
+        if not resp or resp[0] not in '012':
+            raise LX200Error("bad slew reply: %r" % resp)
+        return cls(int(resp[0]), resp[1:])
 
 
 class Telescope:
@@ -36,21 +87,29 @@ class Telescope:
     def __init__(self, comPort, model='LX200', debug=False):
         """Constructor.
         """
-        try:
-            import configparser
-        except BaseException:
-            print('the ConfigParser module is needed for storing setup info.')
-            print('do not use the setup* methods')
         if model in SUPPORTED_MODELS:
             self.model = model
         else:
             raise LX200Error("unsupported model: " + model)
 
         self.comPort = comPort
+        self.site = None  # site number last selected, see set_site
         self.AlignmentMode = None  # 'A','L','P'
-        self.pointingMode = "LOW PRECISION"
-        self.displayPrecision = ""
+        self.slewRate = None  # GUIDE, CENTRE, FIND or MAX, see select_slew_rate
+        self.maxSlewRate = None  # degrees per second, see set_slew_rate
+        self.pointingMode = None  # unknown until the first P toggle reply
+        self.displayPrecision = ""  # "High" or "Low", see probe_precision
+        self.precisionChecked = None
+        self.precisionCheckInterval = None  # seconds, None never re-checks
+        self.siteInfo = None  # SITE_QUERIES replies, see load_site_info
+        self.horizon = None  # a Horizon, for goto to check targets locally
+        self.lstDrift = None  # scope GS minus host LST, seconds
+        self.slewModel = None  # a SlewModel, to predict and learn gotos
+        self.product = None  # GVP and GVN replies, see determine_model
+        self.firmware = None
         self.debug = debug
+        if comPort.connectedPort is not None:
+            self.determine_model(model)
 
     def __repr__(self):
         """Return a representation string.
@@ -71,12 +130,212 @@ class Telescope:
     # utility methods
     # -------------------------------------------------------------------------------
 
+    def _device(self, stable=False):
+        """ key of the connected device: its port or file name; for a port
+        without one its id in DEVICE_MODELS, or with stable (for session
+        files, which outlive the object) its type name"""
+        port = self.comPort.connectedPort
+        name = getattr(port, 'port', None) or getattr(port, 'name', None)
+        if name is None:
+            return type(port).__name__ if stable else id(port)
+        return str(name)
+
     def determine_model(self, model="LX200"):
-        """ TO DO
-        run a series of commands to test for pass/fail
-        """
+        """ Finds the model from the product name (GVP) and firmware number
+        (GVN), asked in one write together with the altitude (GA). Models
+        without GV commands do not answer them, so the first reply shaped
+        like an altitude ends the probe; model is kept if the name does not
+        tell. The altitude also gives the precision, as probe_precision.
+        The result is cached per device, and sets the port's capabilities
+        table so unsupported command groups are refused without a write.
+        Returns: the model"""
+        key = self._device()
+        if self.comPort.debug:
+            self.probe_precision()
+        elif key in DEVICE_MODELS:
+            model, self.product, self.firmware = DEVICE_MODELS[key]
+            self.probe_precision()
+        else:
+            with self.comPort.lock:
+                self.comPort.connectedPort.write(
+                    ''.join([self.comPort.frame(q) for q in
+                             ('GVP', 'GVN', 'GA')]))
+                replies = []
+                while len(replies) < 3:
+                    replies.append(self.comPort.read_to_hash())
+                    if ALTITUDE.match(replies[-1]):
+                        break
+            answers = replies[:-1] + [None, None]
+            self.product, self.firmware = answers[:2]
+            for name, m in PRODUCT_MODELS:
+                if self.product and name in self.product.upper():
+                    model = m
+                    break
+            self.displayPrecision = "High" if len(replies[-1]) > 6 else "Low"
+            self.precisionChecked = time.monotonic()
+            DEVICE_MODELS[key] = (model, self.product, self.firmware)
+        self.model = self.comPort.model = model
+        col = SUPPORTED_MODELS.index(model)
+        self.comPort.capabilities = dict([(g, s[col]) for g, s in
+                                          COMMAND_GROUPS.items()])
         return model
 
+    def _session_key(self):
+        """ section of this device and firmware in a session file"""
+        return '%s %s %s' % (self._device(stable=True), self.product,
+                             self.firmware)
+
+    def _session_fingerprint(self):
+        """ the ACK alignment mode and the current site's latitude and
+        longitude, asked in one write
+        Returns: dict for a session file section"""
+        cmds = [(STRING, 'Gt'), (STRING, 'Gg')]
+        if self.comPort.debug:
+            replies = [self.get_alignment()] + \
+                self.comPort.CommandPipeline(cmds)
+        else:
+            with self.comPort.lock:
+                self.comPort.connectedPort.write(
+                    chr(0x06) + ''.join([self.comPort.frame(c[1])
+                                         for c in cmds]))
+                replies = [self.comPort.connectedPort.read(1)] + \
+                    [self.comPort.read_to_hash() for c in cmds]
+        return dict(zip(('ack', 'lat', 'long'), [str(r) for r in replies]))
+
+    def load_session(self, fileName=SESSION, maxAge=12 * 3600.):
+        """ Restores the state saved by save_session for this device and
+        firmware: the pointing mode, so set_pointing_mode need not toggle P
+        and read its reply to find it (the display precision is probed at
+        every connect). The snapshot is only used if it is less than maxAge
+        seconds old, its display precision matches the connect probe's, and
+        one more exchange finds the same alignment mode and site latitude
+        and longitude as when it was saved. High precision pointing cannot
+        be queried: one toggled on the handbox inside maxAge goes unnoticed.
+        Returns: True if the state was restored"""
+        config = configparser.ConfigParser(interpolation=None)
+        config.read(fileName, encoding='utf-8')
+        key = self._session_key()
+        if not config.has_section(key):
+            return False
+        saved = dict(config.items(key))
+        if saved.get('displayprecision') != self.displayPrecision or \
+                time.time() - float(saved.get('saved', 0)) > maxAge:
+            return False
+        for name, value in self._session_fingerprint().items():
+            if saved.get(name) != value:
+                return False
+        for name in SESSION_STATE:
+            setattr(self, name, saved.get(name.lower()) or None)
+        return True
+
+    def save_session(self, fileName=SESSION):
+        """ Saves the setup state for load_session, keyed by device and
+        firmware; other devices' sections are kept"""
+        config = configparser.ConfigParser(interpolation=None)
+        config.read(fileName, encoding='utf-8')
+        key = self._session_key()
+        if not config.has_section(key):
+            config.add_section(key)
+        for name in SESSION_STATE:
+            value = getattr(self, name)
+            config.set(key, name, '' if value is None else str(value))
+        for name, value in self._session_fingerprint().items():
+            config.set(key, name, value)
+        config.set(key, 'saved', repr(time.time()))
+        with open(fileName, 'w', encoding='utf-8') as f:
+            config.write(f)
+
+    def supports(self, group):
+        """ 'x', 'p' or '-' support of a command group for the model"""
+        return COMMAND_GROUPS[group][SUPPORTED_MODELS.index(self.model)]
+
+    def _poll_schedule(self, measure, fast, slow, hold=0.):
+        """ Generator of the seconds to wait before the next call of measure(),
+        a function returning what is left of a move, 0 when it is done.
+        The rate at which that remainder falls gives an estimated time to go,
+        and the next poll comes after half of it: sparse in the middle of a
+        long move, dense near its end. With no progress to go by the interval
+        doubles. Always clamped to fast..slow seconds, except for a first
+        hold seconds before any poll."""
+        if hold > 0:
+            yield hold
+        last = None
+        interval = fast
+        while True:
+            left = measure()
+            now = time.monotonic()
+            if left <= 0:
+                return
+            if last is not None and last[1] > left:
+                interval = left * (now - last[0]) / (last[1] - left) / 2.
+            else:
+                interval *= 2
+            interval = min(max(interval, fast), slow)
+            last = (now, left)
+            yield interval
+
+    def _wait(self, schedule, timeout=None, cancel=None, abort=None):
+        """ Sleeps through a _poll_schedule.
+        - timeout: seconds before LX200Error is raised, None waits forever
+        - cancel: a threading.Event, checked throughout each sleep; when it is
+          set abort() is called and False returned
+        Returns: True when the move is done"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for interval in schedule:
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise LX200Error("timed out after %.1f s" % timeout)
+                interval = min(interval, remaining)
+            if cancel is None:
+                time.sleep(interval)
+            elif cancel.wait(interval):
+                if abort:
+                    abort()
+                return False
+        return True
+
+    async def _wait_async(self, schedule, timeout=None, abort=None):
+        """ asyncio version of _wait, the port is read in an executor thread.
+        Cancel the awaiting task to stop waiting; abort() is called first."""
+        loop = asyncio.get_running_loop()
+        deadline = None if timeout is None else time.monotonic() + timeout
+        try:
+            while True:
+                interval = await loop.run_in_executor(None, next, schedule, None)
+                if interval is None:
+                    return True
+                if deadline is not None:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise LX200Error("timed out after %.1f s" % timeout)
+                    interval = min(interval, remaining)
+                await asyncio.sleep(interval)
+        except asyncio.CancelledError:
+            if abort:
+                abort()
+            raise
+
+    def load_site_info(self):
+        """ Reads the site names, current site position, UTC offset and slew
+        limits in one pipelined exchange. The get_site* getters are then
+        served from memory and the matching setters keep it up to date, for
+        the rest of the session or until the site is changed.
+        Returns: dict of replies keyed by the SITE_QUERIES command"""
+        replies = self.comPort.CommandPipeline(
+            [(STRING, q) for q in SITE_QUERIES])
+        self.siteInfo = dict(zip(SITE_QUERIES, replies))
+        return self.siteInfo
+
+    def _site_value(self, query):
+        if self.siteInfo is None:
+            self.load_site_info()
+        return self.siteInfo[query]
+
+    def _site_update(self, query, value):
+        if self.siteInfo is not None:
+            self.siteInfo[query] = value
+
     def set_time_lon(self, time, lon):
         """ Since the time setting in seconds is 4x better than the Lon setting
         of minutes, I propose using the combination of Lon and time to minimize
@@ -95,17 +354,18 @@ class Telescope:
         A If scope in AltAz Mode
         L If scope in Land Mode
         P If scope in Polar Mode"""
-        try:
-            self.comPort.connectedPort.write(chr(0x06))
-        except BaseException:
-            raise LX200Error(
-                "get_alignment - port write error:  %s" %
-                (sys.exc_info()[0]))
-
-        if not self.debug:
-            return self.comPort.connectedPort.read(1)
-        else:
-            return 'L'
+        with self.comPort.lock:
+            try:
+                self.comPort.connectedPort.write(chr(0x06))
+            except BaseException:
+                raise LX200Error(
+                    "get_alignment - port write error:  %s" %
+                    (sys.exc_info()[0]))
+
+            if not self.debug:
+                return self.comPort.connectedPort.read(1)
+            else:
+                return 'L'
 
     # -------------------------------------------------------------------------------
     # A - Alignment Commands
@@ -115,17 +375,17 @@ class Telescope:
         Returns:
         1: When complete (can take several minutes).
         0: If scope not AzEl Mounted or align fails"""
+        if self.model != 'LX200GPS':
+            raise LX200Error(
+                "unsupported model: " +
+                self.model +
+                " for auto_align")
         align_res = self.get_alignment()
         if align_res != "A":
             raise LX200Error(
                 "unsupported alignment: " +
                 align_res +
                 " for auto_align")
-        if self.model != 'LX200GPS':
-            raise LX200Error(
-                "unsupported model: " +
-                self.model +
-                " for auto_align")
         result = self.comPort.CommandBool('A', 'a')
         if result != 1:
             raise LX200Error("auto_align failed")
@@ -158,6 +418,43 @@ class Telescope:
         dist = self.comPort.CommandString("D")
         return len(dist.strip())
 
+    def _slew_left(self, target, tolerance):
+        """ remaining-move function for wait_for_slew: the distance bar count,
+        or the degrees from target (RA, Dec) while more than tolerance"""
+        if target is None:
+            return self.get_distance
+        ra, dec = target
+
+        def left():
+            sep = separation(from_lx200_righta(self.get_RA()),
+                             from_lx200_angle(self.get_Dec()), ra, dec)
+            return sep if sep > tolerance else 0
+        return left
+
+    def wait_for_slew(self, timeout=None, cancel=None, target=None,
+                      tolerance=.05, fast=.1, slow=1., expected=None):
+        """ Wait for the current slew to complete.
+        Polls the distance bars, or the scope position when target (RA, Dec)
+        in degrees is given, more often as the slew nears its end.
+        - timeout: seconds before LX200Error is raised, None waits forever
+        - cancel: a threading.Event, when set the slew is halted
+        - fast, slow: shortest and longest seconds between polls
+        - expected: predicted seconds for the slew (see SlewModel), most of
+          it is slept through without polling
+        Returns: True when the slew is complete, False if cancelled"""
+        schedule = self._poll_schedule(self._slew_left(target, tolerance),
+                                       fast, slow, .8 * (expected or 0.))
+        return self._wait(schedule, timeout, cancel, self.AbortSlew)
+
+    async def wait_for_slew_async(self, timeout=None, target=None,
+                                  tolerance=.05, fast=.1, slow=1.,
+                                  expected=None):
+        """ asyncio version of wait_for_slew: cancelling the awaiting task
+        halts the slew."""
+        schedule = self._poll_schedule(self._slew_left(target, tolerance),
+                                       fast, slow, .8 * (expected or 0.))
+        return await self._wait_async(schedule, timeout, self.AbortSlew)
+
     # -------------------------------------------------------------------------------
     # f - Fan Command
     # -------------------------------------------------------------------------------
@@ -248,13 +545,13 @@ class Telescope:
          form is returned, otherwise the longer form is return. On Autostar and
          LX200GPS, the daylight savings setting in effect is factored into
          returned value."""
-        return self.comPort.CommandString("GG")
+        return self._site_value("GG")
 
     def get_current_long(self):
         """ Get Current Site Longitude
         Returns: sDDD*MM")
         The current site Longitude. East Longitudes are expressed as negative"""
-        return self.comPort.CommandString("Gg")
+        return self._site_value("Gg")
 
     def get_high_limit(self):
         """ Get High Limit
@@ -262,7 +559,7 @@ class Telescope:
         The minimum elevation of an object above the horizon to which the
         telescope will slew with reporting a
         "Below Horizon" error."""
-        return self.comPort.CommandString("Gh")
+        return self._site_value("Gh")
 
     def get_local_time_24(self):
         """ Get Local Time in 24 hour format
@@ -275,46 +572,47 @@ class Telescope:
         Returns: DD*#
             The highest elevation above the horizon that the telescope will be
             allowed to slew to without a warning message."""
-        return self.comPort.CommandString("Go")
+        return self._site_value("Go")
 
     def get_site_names(self):
         """ return all names in a List
         """
-        siteList = []
-        siteList.append(self.get_site1())
-        siteList.append(self.get_site2())
-        siteList.append(self.get_site3())
-        siteList.append(self.get_site4())
-        return siteList
+        return [self._site_value(q) for q in SITE_QUERIES[:4]]
 
     def get_site(self, siteNum):
-        """ return site name
+        """ return site name of site 1..4
         """
-        return self.get_site_names()[siteNum - 1]
+        return self._site_value(SITE_QUERIES[self._site_index(siteNum)])
+
+    def _site_index(self, siteNum):
+        """ SITE_QUERIES index of the name of site 1..4"""
+        if siteNum not in [1, 2, 3, 4]:
+            raise LX200Error("site not in [1, 2, 3, 4]: %s" % (siteNum,))
+        return siteNum - 1
 
     def get_site1(self):
         """ Get Site 1 Name
         Returns: <string>#
         A '#' terminated string with the name of the requested site."""
-        return self.comPort.CommandString("GM")
+        return self._site_value("GM")
 
     def get_site2(self):
         """ Get Site 2 Name
         Returns: <string>#
         A '#' terminated string with the name of the requested site."""
-        return self.comPort.CommandString("GN")
+        return self._site_value("GN")
 
     def get_site3(self):
         """ Get Site 3 Name
         Returns: <string>#
         A '#' terminated string with the name of the requested site."""
-        return self.comPort.CommandString("GO")
+        return self._site_value("GO")
 
     def get_site4(self):
         """ Get Site 4 Name
         Returns: <string>#
         A '#' terminated string with the name of the requested site."""
-        return self.comPort.CommandString("GP")
+        return self._site_value("GP")
 
     def get_RA(self):
         """ Get Telescope RA
@@ -329,6 +627,27 @@ class Telescope:
         The Sidereal Time as an ASCII Sexidecimal value in 24 hour format"""
         return self.comPort.CommandString("GS")
 
+    def sidereal_time(self, utc=None):
+        """ Local sidereal time in hours at utc (unix seconds, now if None),
+        computed on the host from the site longitude. The first call checks
+        it against the scope, see check_sidereal_time."""
+        if self.lstDrift is None and not self.debug:
+            self.check_sidereal_time()
+        return local_sidereal_time(to_float(self.get_current_long()), utc)
+
+    def check_sidereal_time(self):
+        """ Compares the scope's GS with the host's sidereal time, once per
+        session (or on demand).
+        Returns: the scope's lead over the host in seconds, also kept in
+        self.lstDrift"""
+        before = time.time()
+        scope = to_float(self.get_sidereal_time())
+        # GS reports whole seconds at about the middle of the exchange
+        local = local_sidereal_time(to_float(self.get_current_long()),
+                                    (before + time.time()) / 2.)
+        self.lstDrift = ((scope - local + 12.) % 24. - 12.) * 3600.
+        return self.lstDrift
+
     def get_tracking_rate(self):
         """ Get tracking rate
         Returns: TT.T#
@@ -341,7 +660,7 @@ class Telescope:
         """ Get Current Site Latitude
         Returns: sDD*MM#
         The latitude of the current site. Positive inplies North latitude."""
-        return self.comPort.CommandString("Gt")
+        return self._site_value("Gt")
 
     def get_AZ(self):
         """ Get telescope azimuth
@@ -372,17 +691,32 @@ class Telescope:
                 " for home command")
         self.comPort.CommandBlind("hF")
 
-    def FindHome(self):
+    def FindHome(self, timeout=None, cancel=None):
         """ Autostar, LX200GPS and LX 16"Slew to Park Position
         Returns: Nothing"""
         self.comPort.CommandBlind("hP")
-        while True:
-            res = self.get_home_status()
-            if res == 0:
-                raise LX200Error("FindHome failed")
-            elif res == 1:
-                break
-            time.sleep(.5)
+        self.wait_for_home(timeout, cancel)
+
+    def _home_left(self):
+        """ remaining-move function for wait_for_home"""
+        res = str(self.get_home_status()).strip()
+        if res == '0':
+            raise LX200Error("FindHome failed")
+        elif res == '1':
+            return 0
+        return 1
+
+    def wait_for_home(self, timeout=None, cancel=None, fast=.25, slow=2.):
+        """ Wait for a home search to complete, see wait_for_slew
+        Returns: True when home is found, False if cancelled
+        Raises LX200Error if the search fails"""
+        schedule = self._poll_schedule(self._home_left, fast, slow)
+        return self._wait(schedule, timeout, cancel, self.AbortSlew)
+
+    async def wait_for_home_async(self, timeout=None, fast=.25, slow=2.):
+        """ asyncio version of wait_for_home"""
+        schedule = self._poll_schedule(self._home_left, fast, slow)
+        return await self._wait_async(schedule, timeout, self.AbortSlew)
 
     def get_home_status(self):
         """ Autostar, LX200GPS and LX 16" Query Home Status
@@ -391,7 +725,7 @@ class Telescope:
         1 Home Search Found
         2 Home Search in Progress
         LX200 Not Supported"""
-        return self.comPort.CommandString("h?")
+        return self.comPort.CommandChar("h?")
 
     # ---------------------------------------------------------------------------
     # H - Time Format Command
@@ -451,26 +785,67 @@ class Telescope:
         0 Slew is Possible
         1<string> Object Below Horizon w/string message
         2<string> Object Below Higher w/string message"""
-        return self.comPort.CommandString("MS")
+        return self.comPort.CommandStatus("MS")
+
+    def goto(self, ra, dec, wait=False, timeout=None, cancel=None):
+        """ Slew to RA, Dec: as for set_target_RA and set_target_DEC, use
+        RA and Dec instances to reuse their encodings on retries.
+        The two targets and the slew go out in one write, so a goto costs
+        one round trip. With wait, returns once the slew is complete, see
+        wait_for_slew. If self.horizon is set targets it rejects are
+        answered locally, without any serial traffic. If self.slewModel is
+        set a waited slew starts with its predicted duration, and is
+        recorded in the model once complete.
+        Returns: GotoResult"""
+        if self.horizon is not None:
+            status = int(self.horizon.status(RA(ra).degrees, Dec(dec).value))
+            if status != GOTO_OK:
+                return GotoResult(status, "rejected by local horizon check")
+        raStr = self._target_RA_payload(ra)
+        decStr = self._target_DEC_payload(dec)
+        cmds = [(BOOL, "Sr", raStr), (BOOL, "Sd", decStr), (STATUS, "MS")]
+        model = self.slewModel if wait else None
+        if model is not None:
+            # where the slew starts from, read in the same write
+            cmds = [(STRING, "GR"), (STRING, "GD")] + cmds
+        started = time.monotonic()
+        replies = self.comPort.CommandPipeline(cmds)
+        raOk, decOk, resp = replies[-3:]
+        result = GotoResult.parse(resp)
+        if not (raOk and decOk):
+            if result.ok:
+                # slewing to the previous target
+                self.AbortSlew()
+            raise LX200Error("target rejected: RA %s %s, Dec %s %s" %
+                             (raStr, raOk, decStr, decOk))
+        if wait and result.ok:
+            if model is None:
+                self.wait_for_slew(timeout, cancel)
+            else:
+                move = (from_lx200_righta(replies[0]),
+                        from_lx200_angle(replies[1]),
+                        RA(ra).degrees, Dec(dec).value)
+                if self.wait_for_slew(timeout, cancel,
+                                      expected=float(model.predict(*move))):
+                    model.record(*(move + (time.monotonic() - started,)))
+        return result
 
     # -------------------------------------------------------------------------------
     # P - High Precision Toggle
     # -------------------------------------------------------------------------------
     def set_pointing_mode(self, mode=None):
         """ set or toggle precision
-        in high precision mode -- requires centering"""
+        in high precision mode -- requires centering
+        Nothing is sent if the scope is known to be in mode already"""
         if not mode:
-            resp = self.toggle_precision()
-        elif mode == 'HIGH PRECISION':
-            resp = self.toggle_precision()
-            if resp == 'LOW PRECISION':
-                resp = self.toggle_precision()
-        elif mode == 'LOW PRECISION':
-            resp = self.toggle_precision()
-            if resp == 'HIGH PRECISION':
-                resp = self.toggle_precision()
-        self.pointingMode = resp
-        return resp
+            return self.toggle_precision()
+        if mode not in ['HIGH PRECISION', 'LOW PRECISION']:
+            raise LX200Error("mode not in ['HIGH PRECISION','LOW PRECISION']")
+        if self.pointingMode != mode:
+            # a second toggle only when the state was unknown
+            if self.toggle_precision() != mode:
+                self.toggle_precision()
+        return self.pointingMode
 
     def toggle_precision(self):
         """ Toggles High Precsion Pointing. When High precision pointing is
@@ -479,12 +854,17 @@ class Telescope:
         Returns: <string>
         "HIGH PRECISION" Current setting after this command.
         "LOW PRECISION" Current setting after this command."""
-        self.comPort.CommandBlind("P")
+        with self.comPort.lock:
+            self.comPort.CommandBlind("P")
 
-        if not self.debug:
-            return self.comPort.connectedPort.read(14)
-        else:
-            return 'HIGH PRECISION'
+            if not self.debug:
+                resp = self.comPort.connectedPort.read(14)
+            elif self.pointingMode == 'HIGH PRECISION':
+                resp = 'LOW PRECISION'
+            else:
+                resp = 'HIGH PRECISION'
+        self.pointingMode = resp.strip()
+        return self.pointingMode
 
     # -------------------------------------------------------------------------------
     # Q- Smart Drive Control
@@ -528,10 +908,15 @@ class Telescope:
     # R - Slew Rate Commands
     # -------------------------------------------------------------------------------
 
-    def set_slew_rate(self, rate):
+    def select_slew_rate(self, rate):
         """Sets slew rate, use one of  GUIDE,  CENTRE,  FIND,
-         MAX -- in order slowest to fastest"""
+         MAX -- in order slowest to fastest, by name or command letter
+        Returns: Nothing"""
+        rate = SLEW_RATES.get(str(rate).upper(), rate)
+        if rate not in SLEW_RATES.values():
+            raise LX200Error("rate not in %s" % sorted(SLEW_RATES))
         self.comPort.CommandBlind('R', rate)
+        self.slewRate = rate
 
     def set_slew_centering(self):
         """ Set Slew rate to Centering rate (2nd slowest)
@@ -560,6 +945,8 @@ class Telescope:
         """Set current site to <n>, an ASCII digit in the range 0..3
         Returns: Nothing"""
         self.comPort.CommandBlind('W', site)
+        self.site = str(site)
+        self.siteInfo = None
 
     def set_target_alt(self, alt):
         """Set target object altitude to sDD*MM# or sDD*MM'SS"
@@ -581,25 +968,26 @@ class Telescope:
     def set_target_DEC(self, angle):
         """Set target object declination to sDD*MM or sDD*MM:SS depending on
         the current precision setting
-        Accepts float or sDD:MM or sDD:MM:SS
+        Accepts a Dec, float or sDD:MM or sDD:MM:SS
         Returns:
         1 - Dec Accepted
         0 - Dec invalid"""
-        if str(angle).count(':') == 0:
-            if self.displayPrecision == "High":
-                s = to_lx200_long_angle(angle)  # got a float, convert
-            else:
-                s = to_lx200_angle(angle)  # got a float, convert
-            return self.comPort.CommandBool("Sd", s)
-        else:  # a string
-            degs, rest = angle.split(':', 1)
-            s = "%s%c%s" % (degs, DEG, rest)  # sub the DEG symbol
-        if self.displayPrecision == "High" and angle.count(':') == 2:
-            return self.comPort.CommandBool("Sd", s)
-        elif self.displayPrecision == "Low" and angle.count(':') == 1:
-            return self.comPort.CommandBool("Sd", s)
-        else:
-            return False
+        return self.comPort.CommandBool("Sd", self._target_DEC_payload(angle))
+
+    def _target_DEC_payload(self, angle):
+        """ the Sd argument for angle, in the current precision
+        Raises LX200Error for an Angle that is not a Dec"""
+        self.check_precision()
+        if isinstance(angle, Dec):
+            return angle.encoding(self.displayPrecision == "High")
+        if isinstance(angle, Angle):
+            raise LX200Error("declination target needs a Dec, not %s" %
+                             type(angle).__name__)
+        if isinstance(angle, str):
+            angle = to_float(angle)
+        if self.displayPrecision == "High":
+            return to_lx200_long_angle(angle)
+        return to_lx200_angle(angle)
 
     def set_lunar_latitude(self, lat):
         """Sets target object to the specificed selenographic latitude on the Moon.
@@ -620,14 +1008,13 @@ class Telescope:
         1 - Valid"""
         if angle < 0:
             angle += 360
-        deg = int(angle)
-        angle -= deg
-        mins = int(angle * 60)
-        long = '%03d%c%02d' % (deg, DEG, mins)
+        mins = int(angle * 60 + .5) % 21600
+        long = '%03d%c%02d' % (mins // 60, DEG, mins % 60)
 
-        if not CommandBool('Sg', int):
-            raise LX200Error("Invalid longitude: %s" % int)
+        if not self.comPort.CommandBool('Sg', long):
+            raise LX200Error("Invalid longitude: %s" % long)
         else:
+            self._site_update('Gg', long)
             return True
 
     def set_UTC_offset(self, hours):
@@ -635,14 +1022,18 @@ class Telescope:
         Returns:
         0 - Invalid
         1 - Valid"""
-        return self.comPort.CommandBool("SG", "%+2.1f" % (hours))
+        offset = "%+2.1f" % (hours)
+        res = self.comPort.CommandBool("SG", offset)
+        if res:
+            self._site_update('GG', offset)
+        return res
 
     def set_local_time(self, ltime):
         """Set the local Time "HH:MM:SS"
         Returns:
         0 - Invalid
         1 - Valid"""
-        return self.comPort.CommandBool("SL", strftime("%H:%M:%S", ltime))
+        return self.comPort.CommandBool("SL", time.strftime("%H:%M:%S", ltime))
 
     def set_site_name(self, site, name):
         """Set site name to be <string>. LX200s only accept 3 character strings. Other scopes accept up to 15 characters.
@@ -651,47 +1042,89 @@ class Telescope:
         1 - Valid"""
         if '#' in name:
             raise LX200Error('Site name cannot contain "#"')
+        query = SITE_QUERIES[self._site_index(site)]
         if self.model == "LX200":
             name = name[:3]
         if not self.comPort.CommandBool('S', chr(ord('M') + site - 1), name):
             raise LX200Error("Invalid site name:" + name)
         else:
+            self._site_update(query, name)
             return True
 
+    def set_min_elev(self, elev):
+        """Set the minimum object elevation limit to DD, see get_high_limit
+        Returns:
+        0 - Invalid
+        1 - Valid"""
+        res = self.comPort.CommandBool("Sh", elev)
+        if res:
+            self._site_update('Gh', '%+03d%c' % (int(elev), DEG))
+            self._limits_changed()
+        return res
+
+    def _limits_changed(self):
+        """ passes new slew limits on to the goto horizon check"""
+        if self.horizon is not None:
+            self.horizon.refresh()
+
     def set_max_elev(self, elev):
         """Set highest elevation to which the telescope will slew - DD
         Returns:
         0 - Invalid
         1 - Valid"""
-        return self.comPort.CommandBool("So" + str(elev) + "*")
+        res = self.comPort.CommandBool("So" + str(elev) + "*")
+        if res:
+            self._site_update('Go', '%02d%c' % (int(elev), DEG))
+            self._limits_changed()
+        return res
 
     def set_target_RA(self, angle):
         """Set target object RA to HH:MM.T or HH:MM:SS depending on the current precision setting.
-        Angle is a float or HH:MM.T or HH:MM:SS
+        Angle is an RA, a float in hours or HH:MM.T or HH:MM:SS
         Returns:
         0 - Invalid
         1 - Valid"""
-        if str(angle).count(':') == 0:
-            hrs = int(angle)
-            mins = (angle - hrs) * 60.
-            secs = (mins - int(mins)) * 60.
-        else:
-            hrs, mins, secs = angle.split(':')
-        if self.displayPrecision == "High":
-            return self.comPort.CommandBool(
-                "Sr", "%02d:%02d:%02d" %
-                (int(hrs), int(mins), int(secs)))
-        else:
-            return self.comPort.CommandBool(
-                "Sr", "%02d:%04.1f" %
-                (int(hrs), mins + secs / 60.))
+        return self.comPort.CommandBool("Sr", self._target_RA_payload(angle))
+
+    def _target_RA_payload(self, angle):
+        """ the Sr argument for angle in hours, in the current precision
+        Raises LX200Error for an Angle that is not an RA"""
+        self.check_precision()
+        if isinstance(angle, RA):
+            return angle.encoding(self.displayPrecision == "High")
+        if isinstance(angle, Angle):
+            raise LX200Error("RA target needs an RA, not %s" %
+                             type(angle).__name__)
+        if isinstance(angle, str):
+            angle = to_float(angle)
+        return to_lx200_righta(angle * 15., self.displayPrecision == "High")
+
+    def target_payloads(self, ra, dec):
+        """ Sr and Sd arguments for arrays of RA (hours) and Dec (degrees)
+        in the current precision, formatted ahead of time for
+        set_target_payloads. Needs numpy.
+        Returns: two numpy string arrays"""
+        if np is None:
+            raise LX200Error("numpy is needed for target_payloads")
+        self.check_precision()
+        high = self.displayPrecision == "High"
+        return (to_lx200_righta_array(np.asarray(ra, dtype=float) * 15., high),
+                to_lx200_angle_array(dec, high))
+
+    def set_target_payloads(self, raStr, decStr):
+        """ Sets target RA and Dec from preformatted Sr and Sd arguments,
+        see target_payloads, in one pipelined write.
+        Returns: True if both were accepted"""
+        raOk, decOk = self.comPort.CommandPipeline(
+            [(BOOL, "Sr", raStr), (BOOL, "Sd", decStr)])
+        return raOk and decOk
 
     def set_sideral_time(self, stime):
         """Sets the local sideral time to HH:MM:SS
         Returns:
         0 - Invalid
         1 - Valid"""
-        return self.comPort.CommandBool("SS", strftime("%H:%M:%S", stime))
+        return self.comPort.CommandBool("SS", time.strftime("%H:%M:%S", stime))
 
     def set_site_latitude(self, angle):
         """Sets the current site latitude to sDD*MM#
@@ -699,10 +1132,10 @@ class Telescope:
         0 - Invalid
         1 - Valid"""
         dms = to_lx200_angle(angle)
-        pair = dms.split(' ')
-        if not CommandBool('St', pair[0]):
-            raise LX200Error("Invalid latitude: %s" % int)
+        if not self.comPort.CommandBool('St', dms):
+            raise LX200Error("Invalid latitude: %s" % dms)
         else:
+            self._site_update('Gt', dms)
             return True
 
     def set_tracking_rate(self, rate):
@@ -715,10 +1148,26 @@ class Telescope:
 
     def set_slew_rate(self, N):
         """Set maximum slew rate to N degrees per second. N is the range (2..8)
+        A rate name (GUIDE, CENTRE, FIND, MAX) is passed on to
+        select_slew_rate instead.
         Returns:
         0 - Invalid
         1 - Valid"""
-        return self.comPort.CommandBool("Sw", N)
+        if str(N).upper() in SLEW_RATES or N in SLEW_RATES.values():
+            self.select_slew_rate(N)
+            return True
+        try:
+            N = int(N)
+        except ValueError:
+            raise LX200Error("slew rate not a name or in 2..8: %s" % N)
+        if not 2 <= N <= 8:
+            raise LX200Error("slew rate not in 2..8: %s" % N)
+        res = self.comPort.CommandBool("Sw", N)
+        if res:
+            self.maxSlewRate = str(N)
+            if self.slewModel is not None:
+                self.slewModel.set_rates(N, N)
+        return res
 
     def set_target_AZ(self, az):
         """Sets the target Object Azimuth [LX 16" and LX200GPS only]
@@ -774,20 +1223,46 @@ class Telescope:
                 self.model +
                 " for precision_toggle")
         self.comPort.CommandBlind("U")
-        strLen = len(self.comPort.CommandString(self.comPort, 'GA'))
-        if strLen > 6:
-            self.displayPrecision = "High"
-        else:
+        if self.displayPrecision == "High":
             self.displayPrecision = "Low"
+        else:
+            self.displayPrecision = "High"
 
     def set_precision_type(self, pType):
-        """Sets telescope to give various position responses
-         No command to check precision, so read something"""
-        strLen = len(self.comPort.CommandString(self.comPort, 'GA'))
-        if pType == "Low" and strLen > 6:
+        """Sets telescope to give various position responses, "High" or "Low"
+        Toggles only if the tracked precision differs"""
+        if pType not in ["High", "Low"]:
+            raise LX200Error("precision not in ['High','Low']")
+        if self.displayPrecision != pType:
             self.comPort.CommandBlind('U')
         self.displayPrecision = pType
 
+    def probe_precision(self):
+        """ No command to check precision, so read something: the altitude
+        is sDD*MM in low and sDD*MM'SS in high precision.
+        Done once at construction, the U commands then track it locally.
+        Returns: "High" or "Low" """
+        strLen = len(self.comPort.CommandString('GA'))
+        if strLen > 6:
+            self.displayPrecision = "High"
+        else:
+            self.displayPrecision = "Low"
+        self.precisionChecked = time.monotonic()
+        return self.displayPrecision
+
+    def check_precision(self):
+        """ Optional consistency check of the tracked display precision,
+        re-probes when precisionCheckInterval seconds have passed since the
+        last probe. Called before formatting target coordinates.
+        Returns: False if the scope had drifted from the tracked state"""
+        if (self.precisionCheckInterval is None or
+                self.precisionChecked is not None and
+                time.monotonic() - self.precisionChecked <
+                self.precisionCheckInterval):
+            return True
+        known = self.displayPrecision
+        return self.probe_precision() == known
+
     # -------------------------------------------------------------------------------
     # W - Site Select
     # -------------------------------------------------------------------------------
@@ -795,6 +1270,8 @@ class Telescope:
         """Set current site to <n>, an ASCII digit in the range 0..3
         Returns: Nothing"""
         self.comPort.CommandBlind("W", num)
+        self.site = str(num)
+        self.siteInfo = None
 
     # -------------------------------------------------------------------------------
     # ? - Help Text Retrieval
@@ -83,16 +83,17 @@ from LX200 import *
 port = LXSerial(debug=True)
 port.connect("COM1")
 scope = Telescope(port, "LX200", debug=True) #
+scope.load_session() # optional, skips the P toggles if nothing changed
 scope.set_site(1)
 scope.set_align_mode("P")
 scope.set_slew_rate(Telescope.FIND)
-if scope.determine_model=="LX200GPS": #optional
-    scope.model = 'LX200GPS'
+if scope.model == "LX200GPS": # found by determine_model at connect
     scope.auto_align()
 else:
     raw_input("do your alignment, then press enter ")
 
 scope.set_pointing_mode(mode='HIGH PRECISION')
+scope.save_session()
 library = Library(port, scope)
 library.set_M_object(101)
 #fine adjust
@@ -133,6 +134,8 @@ def main(argv):
         print('COM1 connect failed')
         return
     scope = Telescope(port, argv[1], debug=False)
+    # a matching snapshot saves set_pointing_mode its P toggles
+    scope.load_session()
     scope.set_site(1)
     scope.set_align_mode('P')
     scope.set_slew_rate('FIND')
@@ -142,6 +145,7 @@ def main(argv):
         input("do your alignment, then press enter ")
 
     scope.set_pointing_mode('HIGH PRECISION')
+    scope.save_session()
     library = Library(port, scope)
     library.set_M_object(101)
     # fine adjust
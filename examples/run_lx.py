@@ -51,12 +51,14 @@ def main():
     port = LXSerial(debug=False)  # an LX200 must be on and connected!
     port.connect(portName)
     scope = Telescope(port, "LX200", debug=True)
+    scope.load_session()  # pointing mode known from the last run
     scope.set_precision_type('High')
 
     scope.set_target_RA(targetRA)  # uses decimal notation
     scope.set_target_DEC(targetDEC)  # uses decimal notation
 
     scope.set_slew_rate(slewRate)
+    scope.save_session()
 
     # scope.set_site(1)
     # scope.set_align_mode("P")
@@ -0,0 +1,46 @@
+#!/usr/bin/env python
+# -----------------------------------------------------------------------------
+# Name:        test_NameIndex.py
+# Purpose:     NameIndex examples, run with pytest
+#
+# Author(s):   R J Schumacher
+#
+# Created:     2026/10/19
+# RCS-ID:      $Id: test_NameIndex.py $
+# Copyright:   (c) 2026
+# Licence:     LGPL
+#
+# -----------------------------------------------------------------------------
+
+import pytest
+from LX200.Catalog import Catalog, CatalogWriter
+from LX200.NameIndex import NameIndex
+
+
+@pytest.fixture(scope='module')
+def names(tmp_path_factory):
+    path = str(tmp_path_factory.mktemp('objects'))
+    writer = CatalogWriter(path)
+    writer.append({'catalog': ['M', 'M', 'NGC', 'NGC'],
+                   'number': [31, 42, 224, 1976],
+                   'ra': [10.68, 83.82, 10.68, 83.82],
+                   'dec': [41.27, -5.39, 41.27, -5.39],
+                   'name': ['Andromeda Galaxy, NGC 224', 'Orion Nebula', '',
+                            'Great Orion Nebula, M42']})
+    writer.close()
+    return NameIndex(Catalog(path))
+
+
+def test_designations(names):
+    assert names.resolve('Messier 31') == ('M', 31)
+    assert names.find('NGC224') == [('M', 31), ('NGC', 224)]
+
+
+def test_prefix(names):
+    assert names.prefix('andro') == [('M', 31), ('NGC', 224)]
+
+
+def test_search_typo(names):
+    assert names.search('Andromda') == [('M', 31), ('NGC', 224)]
+    assert names.search('Orian Nebula') == [('M', 42), ('NGC', 1976)]
+    assert names.fuzzy('Zzyzx') == []